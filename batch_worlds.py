@@ -0,0 +1,404 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from engine import Engine, SimulationConfig
+from perception import cast_rays
+from policies import POLICIES
+from scenario import load_scenario
+from watchdog import LABELS, REASON_COLUMN, Termination, Watchdog
+from world import Mode
+from zones import Zones, spawn_position
+
+N_FEATURES = 6
+
+
+class BatchEngine:
+    # K independent runs of one policy stepped together. Every per-robot quantity is a (K, N) array and the
+    # knowledge bases a (K, rows, 6) one, so a tick costs the same few dozen array operations for 1 world or
+    # 1000 instead of K passes through the per-robot Python loop. World k draws from default_rng(seeds[k])
+    # in the same order as Engine, so it replays the Engine run of that seed; the loops over robot indices
+    # below keep the order in which the engine lets robots see each other's new modes and knowledge
+    NOISE_BLOCK = 256
+
+    def __init__(self, policy, seeds, config=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy: {policy}")
+        config = config if config is not None else SimulationConfig()
+        if policy == 'empathetic' and config.knowledge_capacity is not None:
+            raise ValueError("Batched worlds keep every knowledge base unbounded; knowledge_capacity is not supported")
+        if policy == 'empathetic' and config.reward_tolerance is not None:
+            raise ValueError("Batched worlds score rewards exactly; reward_tolerance is not supported")
+        self.policy = policy
+        self.empathetic = policy == 'empathetic'
+        self.config = config
+        self.seeds = list(seeds)
+        self.ticks = 0
+        self.results = [None] * len(self.seeds)
+
+        spawns = config.spawns[:config.robot_count]
+        k, n = len(self.seeds), config.robot_count
+        self.identifiers = [identifier for _, _, identifier in spawns]
+        self.identifiers += [str(number + 1) for number in range(len(spawns), n)]
+        # Original position in seeds of every world still held; finished worlds are dropped now and then
+        self.ids = np.arange(k)
+        self.rngs = [np.random.default_rng(seed) for seed in self.seeds]
+        self.x = np.empty((k, n))
+        self.y = np.empty((k, n))
+        self.angle = np.empty((k, n))
+        for w, rng in enumerate(self.rngs):
+            for i, (x, y, _) in enumerate(spawns):
+                self.x[w, i], self.y[w, i] = x, y
+                self.angle[w, i] = rng.uniform(0, 2 * math.pi)
+            for i in range(len(spawns), n):
+                self.x[w, i], self.y[w, i] = spawn_position(rng, config.spawn_areas())
+                self.angle[w, i] = rng.uniform(0, 2 * math.pi)
+        self.speed = np.full((k, n), float(config.speed))
+        self.active = np.ones((k, n), dtype=bool)
+        self.mode = np.zeros((k, n), dtype=np.uint8)
+        self.battery_level = np.full((k, n), float(config.battery))
+        self.last_battery_update = np.zeros((k, n), dtype=np.int64)
+        self.finish_tick = np.full((k, n), -1, dtype=np.int64)
+        self.running = np.ones(k, dtype=bool)
+        self.zones = Zones(config)
+        self.watchdog = Watchdog(config, (k, n), self.zones)
+        self.noise = np.empty((k, self.NOISE_BLOCK, n))
+
+        self.battery_interval = round(10 / config.dt)
+
+        if self.empathetic:
+            self.see_target = np.zeros((k, n), dtype=bool)
+            self.current_reward = np.zeros((k, n))
+            self.empatyczne = np.zeros((k, n), dtype=np.int64)
+            self.skipped = np.zeros((k, n), dtype=np.int64)
+            self.analyzed = np.zeros((k, n), dtype=np.int64)
+            self.knowledge_at_finish = np.zeros((k, n), dtype=np.int64)
+            self.skipped_at_finish = np.zeros((k, n), dtype=np.int64)
+            # One knowledge base per world, all with the same row capacity; rows past kb_size are zero
+            dtype = np.dtype(config.knowledge_dtype)
+            seed_states = np.asarray(config.knowledge, dtype=dtype)
+            rows = max(64, len(seed_states))
+            self.kb_states = np.zeros((k, rows, N_FEATURES), dtype=dtype)
+            self.kb_rewards = np.zeros((k, rows), dtype=dtype)
+            self.kb_sq_norms = np.zeros((k, rows))
+            self.kb_states[:, :len(seed_states)] = seed_states
+            self.kb_rewards[:, :len(seed_states)] = np.asarray(config.rewards, dtype=dtype)
+            stored = seed_states.astype(float)
+            self.kb_sq_norms[:, :len(seed_states)] = np.einsum('ij,ij->i', stored, stored)
+            self.kb_size = np.full(k, len(seed_states), dtype=np.int64)
+
+    # Arrays with one entry per world held, in the order the worlds are
+    def _world_arrays(self):
+        names = ['ids', 'x', 'y', 'angle', 'speed', 'active', 'mode', 'battery_level', 'last_battery_update',
+                 'finish_tick', 'running', 'noise']
+        if self.empathetic:
+            names += ['see_target', 'current_reward', 'empatyczne', 'skipped', 'analyzed', 'knowledge_at_finish',
+                      'skipped_at_finish', 'kb_states', 'kb_rewards', 'kb_sq_norms', 'kb_size']
+        return names
+
+    def _drop_finished(self):
+        keep = self.running
+        for name in self._world_arrays():
+            setattr(self, name, getattr(self, name)[keep])
+        self.rngs = [rng for rng, kept in zip(self.rngs, keep) if kept]
+        self.watchdog.keep(keep)
+
+    def visibility(self):
+        # (K, N, N) in-view-cone flags and distances from robot i to robot j, as perception.Visibility
+        # computes them pair by pair
+        config = self.config
+        dx = self.x[:, None, :] - self.x[:, :, None]
+        dy = self.y[:, None, :] - self.y[:, :, None]
+        distance = np.hypot(dx, dy)
+        angle_diff = (np.arctan2(dy, dx) - self.angle[:, :, None]) % (2 * math.pi)
+        angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+        visible = (distance <= config.view_distance) & (np.abs(angle_diff) <= config.view_angle / 2)
+        visible &= ~np.eye(self.x.shape[1], dtype=bool)
+        return visible, distance
+
+    def perceive(self, visible, distance):
+        # (K, N, 6) state vectors, feature for feature as EmpatheticPolicy.perceive_all
+        config = self.config
+        k, n = self.x.shape
+        view_distance = config.view_distance
+
+        angles = (self.angle + -config.view_angle / 2) % (2 * math.pi)
+        edge = cast_rays(self.x.ravel(), self.y.ravel(), angles.ravel(), config.width, config.height).reshape(k, n)
+        edge = np.where(edge < view_distance, np.round(1 - edge / 150, 2), 0)
+
+        to_target = self.zones.target_distance(self.x, self.y)
+        to_target = np.round(np.where(to_target < view_distance, 1 - to_target / view_distance, 0), 2)
+
+        fraction = np.round(visible.sum(axis=2) / (n - 1), 2) if n > 1 else np.zeros((k, n))
+
+        def proximity(mode):
+            near = visible & (self.mode == mode)[:, None, :] & (distance < view_distance)
+            nearest = np.where(near, distance, np.inf).min(axis=2)
+            return np.where(np.isfinite(nearest), 1 - nearest / view_distance, 0.0)
+
+        return np.stack([self.battery_level, edge, to_target, fraction,
+                         np.round(proximity(Mode.TARGET), 2), proximity(Mode.FOLLOWING)], axis=-1)
+
+    def _knowledge(self, worlds):
+        # Stored states, rewards, squared norms and the valid-row mask of the given worlds' knowledge bases
+        rows = int(self.kb_size[worlds].max())
+        valid = np.arange(rows) < self.kb_size[worlds, None]
+        return (self.kb_states[worlds, :rows], self.kb_rewards[worlds, :rows], self.kb_sq_norms[worlds, :rows],
+                valid)
+
+    def _append(self, worlds, states, rewards):
+        rows = self.kb_size[worlds]
+        if rows.max() >= self.kb_states.shape[1]:
+            for name in ('kb_states', 'kb_rewards', 'kb_sq_norms'):
+                old = getattr(self, name)
+                new = np.zeros((old.shape[0], 2 * old.shape[1]) + old.shape[2:], dtype=old.dtype)
+                new[:, :old.shape[1]] = old
+                setattr(self, name, new)
+        self.kb_states[worlds, rows] = states
+        self.kb_rewards[worlds, rows] = rewards
+        stored = self.kb_states[worlds, rows].astype(float)
+        self.kb_sq_norms[worlds, rows] = np.einsum('ij,ij->i', stored, stored)
+        self.kb_size[worlds] += 1
+
+    def sense(self, searching, visible, distance):
+        # Robot by robot, as the engine does, since each robot's state may join the knowledge bases before
+        # the next robot is scored; the work for one robot index is vectorized over the worlds
+        states = self.perceive(visible, distance)
+        threshold = self.config.similarity_threshold
+        for i in range(states.shape[1]):
+            worlds = np.flatnonzero(searching[:, i])
+            if not len(worlds):
+                continue
+            state = states[worlds, i]
+            kb_states, kb_rewards, kb_sq_norms, valid = self._knowledge(worlds)
+            weighted_rewards = np.where(valid, kb_rewards, 0)
+            total_weight = self.kb_size[worlds]
+
+            # KnowledgeBase.rewards_for: the expected reward through the |a|^2 + |b|^2 - 2ab expansion
+            cross = np.matmul(kb_states, state.astype(kb_states.dtype)[:, :, None])[:, :, 0]
+            sq = np.einsum('ij,ij->i', state, state)[:, None] + kb_sq_norms - 2 * cross
+            similarities = 1 - np.sqrt(np.maximum(sq, 0) / N_FEATURES)
+            self.current_reward[worlds, i] = np.einsum('ij,ij->i', similarities, weighted_rewards) / total_weight
+
+            # KnowledgeBase.has_similar and reward: exact distances to every stored state
+            diff = kb_states - state[:, None, :]
+            similarities = 1 - np.sqrt(np.einsum('ijk,ijk->ij', diff, diff) / N_FEATURES)
+            similar = np.where(valid, similarities, -np.inf).max(axis=1) > threshold if threshold < 1 else \
+                np.zeros(len(worlds), dtype=bool)
+            self.skipped[worlds[similar], i] += 1
+            new = ~similar
+            if new.any():
+                rewards = np.einsum('ij,ij->i', similarities[new], weighted_rewards[new]) / total_weight[new]
+                self._append(worlds[new], state[new], rewards)
+                self.analyzed[worlds[new], i] += 1
+
+    def decide(self, moving, visible):
+        # Headings as EmpatheticPolicy.choose_heading / SelfishPolicy.choose_heading; returns the steer mask
+        # and heading targets, everything else wanders
+        target = self.zones.visible_target(self.x, self.y, self.angle)
+        steer = moving & (target >= 0)
+        heading_x = np.where(steer, self.zones.centres[target, 0], 0.0)
+        heading_y = np.where(steer, self.zones.centres[target, 1], 0.0)
+        if not self.empathetic:
+            return steer, heading_x, heading_y
+
+        for i in range(self.x.shape[1]):
+            target = steer[:, i]
+            self.mode[target, i] = Mode.TARGET
+            self.see_target[target, i] = True
+            worlds = np.flatnonzero(moving[:, i] & ~target)
+            if not len(worlds):
+                continue
+            # The first visible robot, by index, that sees the target or expects more; modes set earlier
+            # in this loop already count
+            mode, see_target, reward = self.mode[worlds], self.see_target[worlds], self.current_reward[worlds]
+            candidates = visible[worlds, i] & ((mode == Mode.TARGET) | (see_target & (reward[:, i, None] < reward)))
+            follows = candidates.any(axis=1)
+            leader = candidates.argmax(axis=1)
+            following, searching = worlds[follows], worlds[~follows]
+            self.mode[following, i] = Mode.FOLLOWING
+            self.empatyczne[following, i] = 1
+            steer[following, i] = True
+            heading_x[following, i] = self.x[following, leader[follows]]
+            heading_y[following, i] = self.y[following, leader[follows]]
+            self.mode[searching, i] = Mode.SEARCHING
+            self.see_target[worlds, i] = False
+        return steer, heading_x, heading_y
+
+    def move(self, steer, heading_x, heading_y, wander, noise):
+        # World.step for every world at once
+        turn_speed = self.config.turn_speed
+        target_angle = np.arctan2(heading_y - self.y, heading_x - self.x)
+        angle_diff = (target_angle - self.angle) % (2 * math.pi)
+        angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+        turned = np.where(np.abs(angle_diff) < turn_speed, target_angle,
+                          self.angle + np.clip(angle_diff, -turn_speed, turn_speed))
+        self.angle = np.where(steer, turned, self.angle)
+        self.angle = np.where(wander, self.angle + noise, self.angle)
+
+        active = self.active
+        x = self.x + self.speed * np.cos(self.angle)
+        y = self.y + self.speed * np.sin(self.angle)
+        outside = active & ((x < 0) | (x > self.config.width) | (y < 0) | (y > self.config.height))
+        self.angle = np.where(outside, (self.angle + math.pi) % (2 * math.pi), self.angle)
+        self.x = np.where(active, np.clip(x, 0, self.config.width), self.x)
+        self.y = np.where(active, np.clip(y, 0, self.config.height), self.y)
+
+    def avoid_collisions(self):
+        # Each robot turns a quarter once per active robot it touches, one turn at a time as in the pair loop
+        n = self.x.shape[1]
+        first, second = np.triu_indices(n, k=1)
+        distance = np.hypot(self.x[:, first] - self.x[:, second], self.y[:, first] - self.y[:, second])
+        touching = self.active[:, first] & self.active[:, second] & (distance < self.config.robot_size)
+        if not touching.any():
+            return
+        counts = np.zeros(self.x.shape, dtype=np.int64)
+        np.add.at(counts, (slice(None), first), touching)
+        np.add.at(counts, (slice(None), second), touching)
+        for turn in range(counts.max()):
+            self.angle = np.where(counts > turn, (self.angle + math.pi / 2) % (2 * math.pi), self.angle)
+
+    def step(self):
+        # Advances every world by one tick; worlds whose robots are all safe get their result row
+        config = self.config
+        safe = self.zones.in_safe_area(self.x, self.y)
+        searching = ~safe
+        self.speed[safe] = 0
+        self.active[safe] = False
+        if self.empathetic:
+            self.mode[safe] = Mode.STOPPED
+        finished = safe & (self.finish_tick < 0)
+        if finished.any():
+            self.finish_tick[finished] = self.ticks
+            if self.empathetic:
+                self.knowledge_at_finish[finished] = np.broadcast_to(self.kb_size[:, None], safe.shape)[finished]
+                self.skipped_at_finish[finished] = self.skipped[finished]
+
+        alive = searching & self.active
+        due = alive & (self.ticks - self.last_battery_update >= self.battery_interval)
+        self.battery_level[due] = np.maximum(0, self.battery_level[due] - 2)
+        self.last_battery_update[due] = self.ticks
+        died = alive & (self.battery_level <= 0)
+        self.speed[died] = 0
+        self.active[died] = False
+        self.mode[died] = Mode.STOPPED
+
+        visible = None
+        if self.empathetic and searching.any():
+            visible, distance = self.visibility()
+            self.sense(searching, visible, distance)
+
+        block = self.ticks % self.NOISE_BLOCK
+        if block == 0:
+            for w, rng in enumerate(self.rngs):
+                self.noise[w] = rng.uniform(-config.turn_speed, config.turn_speed, size=self.noise.shape[1:])
+        moving = searching & self.active
+        steer, heading_x, heading_y = self.decide(moving, visible)
+        self.move(steer, heading_x, heading_y, moving & ~steer, self.noise[:, block])
+        self.avoid_collisions()
+
+        # Worlds with every robot safe are finished; the watchdog ends the ones that never will be
+        reason = self.watchdog.check(self.ticks, self.x, self.y, self.finish_tick < 0, self.active)
+        reason = np.where(searching.any(axis=1), reason, Termination.FINISHED)
+        ended = self.running & (reason != Termination.RUNNING)
+        for w in np.flatnonzero(ended):
+            self.results[self.ids[w]] = self.result(w, Termination(reason[w]))
+        self.running &= ~ended
+        self.ticks += 1
+        # Finished worlds only cost array width, so they are dropped once they are a quarter of the batch
+        if (~self.running).sum() * 4 >= len(self.running) and self.running.any():
+            self._drop_finished()
+
+    def result(self, w, reason=Termination.FINISHED):
+        # The Engine.result row of one world
+        dt = self.config.dt
+        entry_times = {}
+        for i in np.lexsort((np.arange(self.x.shape[1]), self.finish_tick[w])):
+            if self.finish_tick[w, i] >= 0:
+                entry_times[self.identifiers[i]] = round(int(self.finish_tick[w, i]) * dt, 2)
+        # Empty places as in Engine.result
+        order = list(entry_times) + [None] * 3
+        battery = self.battery_level[w].tolist() + [None] * 3
+        data = {
+            'Czas symulacji': round(self.ticks * dt, 2),
+            'Poziom baterii A': battery[0],
+            'Poziom baterii B': battery[1],
+            'Poziom baterii C': battery[2],
+            'Czas robota A': entry_times.get('A'),
+            'Czas robota B': entry_times.get('B'),
+            'Czas robota C': entry_times.get('C'),
+            'Pierwszy robot': order[0],
+            'Drugi robot': order[1],
+            'Trzeci robot': order[2],
+        }
+        if self.empathetic:
+            finished = self.finish_tick[w] >= 0
+            knowledge = {identifier: int(size) for identifier, size, done in
+                         zip(self.identifiers, self.knowledge_at_finish[w], finished) if done}
+            skipped = {identifier: int(count) for identifier, count, done in
+                       zip(self.identifiers, self.skipped_at_finish[w], finished) if done}
+            data.update({
+                'Wiedza A': knowledge.get('A'),
+                'Wiedza B': knowledge.get('B'),
+                'Wiedza C': knowledge.get('C'),
+                'Zachowania empatyczne': int(self.empatyczne[w].sum()),
+                'Pominięte stany A': skipped.get('A'),
+                'Pominięte stany B': skipped.get('B'),
+                'Pominięte stany C': skipped.get('C'),
+            })
+        data[REASON_COLUMN] = LABELS[reason]
+        return data
+
+    def run(self, max_ticks=None):
+        # Result rows in seed order; None for worlds still running when max_ticks ran out
+        while self.running.any() and (max_ticks is None or self.ticks < max_ticks):
+            self.step()
+        return self.results
+
+
+def run_batch(policy, seeds, config=None, max_ticks=None):
+    return BatchEngine(policy, seeds, config).run(max_ticks)
+
+
+def compare(policy, seeds, config=None):
+    # Result columns where each world differs from the Engine run of its seed
+    batched = run_batch(policy, seeds, config)
+    differences = []
+    for seed, row in zip(seeds, batched):
+        reference = Engine(POLICIES[policy](), config, seed).run()
+        columns = [name for name in reference if reference[name] != row[name]]
+        if columns:
+            differences.append((seed, columns))
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless worlds of one policy stepped together.")
+    parser.add_argument('policy', choices=sorted(POLICIES))
+    parser.add_argument('--worlds', type=int, default=256, help="worlds stepped together")
+    parser.add_argument('--seed', type=int, default=0, help="world k runs with seed + k")
+    parser.add_argument('--scenario', default=None, help="JSON scenario file with the arena, zones and spawns")
+    parser.add_argument('--compare', type=int, default=0,
+                        help="also run the first COMPARE seeds through Engine and report differing results")
+    args = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.worlds))
+    config = load_scenario(args.scenario) if args.scenario else None
+    start = time.perf_counter()
+    engine = BatchEngine(args.policy, seeds, config)
+    results = engine.run()
+    elapsed = time.perf_counter() - start
+    times = np.array([row['Czas symulacji'] for row in results])
+    print(f"{args.worlds} worlds in {elapsed:.2f} s ({args.worlds / elapsed:.1f} runs/s, {engine.ticks} ticks), "
+          f"mean simulation time {times.mean():.2f} s")
+    if args.compare:
+        differences = compare(args.policy, seeds[:args.compare], config)
+        print(f"{args.compare - len(differences)}/{args.compare} worlds match the engine exactly")
+        for seed, columns in differences:
+            print(f"  seed {seed}: {', '.join(columns)}")
+
+
+if __name__ == "__main__":
+    main()
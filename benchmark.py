@@ -0,0 +1,188 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import knowledge
+from engine import SimulationConfig, run_simulation
+from knowledge import KnowledgeBase
+from perception import Visibility
+from policies import POLICIES
+from spatial_hash import SpatialHash
+from world import World
+
+
+def latency_summary(seconds):
+    seconds = np.asarray(seconds)
+    if len(seconds) == 0:
+        return {'ticks': 0}
+    return {
+        'ticks': len(seconds),
+        'ticks_per_sec': len(seconds) / seconds.sum(),
+        'latency_ms': {f'p{q}': float(np.percentile(seconds, q) * 1000) for q in (50, 90, 99)} | {
+            'mean': float(seconds.mean() * 1000),
+            'max': float(seconds.max() * 1000),
+        },
+    }
+
+
+def knowledge_states(size, seed=0):
+    # The seed knowledge followed by random states and rewards up to the requested size
+    rng = np.random.default_rng(seed)
+    extra = max(0, size - len(knowledge.KNOWLEDGE))
+    states = np.vstack([knowledge.KNOWLEDGE, rng.random((extra, 6))])
+    rewards = np.concatenate([knowledge.REWARDS, rng.random(extra)])
+    return states, rewards
+
+
+def bench_loop(policy, robots, knowledge_size, threshold, ticks, seed=0):
+    # Times every tick of a headless run; the first tick (warm-up) is left out of the summary
+    config = SimulationConfig(robot_count=robots)
+    if policy == 'empathetic':
+        states, rewards = knowledge_states(knowledge_size, seed)
+        config.knowledge, config.rewards = states.tolist(), rewards.tolist()
+        config.similarity_threshold = threshold
+    stamps = []
+    run_simulation(POLICIES[policy](), config, seed, max_ticks=ticks,
+                   tick_hook=lambda tick: stamps.append(time.perf_counter()))
+    result = {'policy': policy, 'robots': robots}
+    if policy == 'empathetic':
+        result.update(knowledge=knowledge_size, threshold=threshold)
+    return result | latency_summary(np.diff(stamps))
+
+
+def timeit(function, repeat=5, min_time=0.05):
+    # Best per-call time over several rounds, each long enough to swamp timer resolution
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2
+    best = elapsed / calls
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return {'calls': calls, 'best_us': best * 1e6}
+
+
+def bench_primitives(robot_counts, knowledge_sizes, threshold, seed=0, tolerance=None):
+    rng = np.random.default_rng(seed)
+    config = SimulationConfig()
+    view_distance, view_angle = config.view_distance, config.view_angle
+    width, height = config.width, config.height
+    results = []
+
+    state = rng.random(6)
+    for size in knowledge_sizes:
+        states, rewards = knowledge_states(size, seed)
+        kb = KnowledgeBase(states, rewards, similarity_threshold=threshold)
+        queries = rng.random((64, 6))
+        cases = {
+            'similarity': lambda: knowledge.similarity(states[-1], state),
+            'calculate_reward': lambda: knowledge.calculate_reward(state, states, rewards),
+            'KnowledgeBase.reward': lambda: kb.reward(state),
+            'KnowledgeBase.rewards_for[64]': lambda: kb.rewards_for(queries),
+            'KnowledgeBase.has_similar': lambda: kb.has_similar(state),
+        }
+        if tolerance is not None:
+            approximate = KnowledgeBase(states, rewards, similarity_threshold=threshold, tolerance=tolerance)
+            cases['KnowledgeBase.reward (approximate)'] = lambda: approximate.reward(state)
+            cases['KnowledgeBase.rewards_for[64] (approximate)'] = lambda: approximate.rewards_for(queries)
+        for name, function in cases.items():
+            results.append({'primitive': name, 'knowledge': size} | timeit(function))
+
+    for count in robot_counts:
+        world = World(width, height, 0, 0, 0, rng=np.random.default_rng(seed))
+        for _ in range(count):
+            world.add_robot(rng.uniform(0, width), rng.uniform(0, height))
+        view_grid = SpatialHash(view_distance)
+        collision_grid = SpatialHash(config.robot_size)
+        cases = {
+            'Visibility': lambda: Visibility(world.x, world.y, world.angle, view_distance, view_angle, view_grid),
+            'SpatialHash.candidate_pairs': lambda: collision_grid.candidate_pairs(world.x, world.y),
+            'World.collisions': lambda: world.collisions(config.robot_size, collision_grid),
+        }
+        if count <= 1000:
+            # The all-pairs path is quadratic in memory, so only small swarms are timed without the grid
+            cases['Visibility (all pairs)'] = lambda: Visibility(world.x, world.y, world.angle, view_distance, view_angle)
+        for name, function in cases.items():
+            results.append({'primitive': name, 'robots': count} | timeit(function))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the headless simulation loops and their primitives.")
+    parser.add_argument('--policies', nargs='+', choices=sorted(POLICIES), default=sorted(POLICIES))
+    parser.add_argument('--robots', nargs='+', type=int, default=[3, 30, 300, 1000, 5000])
+    parser.add_argument('--knowledge', nargs='+', type=int, default=[8, 1000, 10000, 100000])
+    parser.add_argument('--thresholds', nargs='+', type=float, default=[SimulationConfig.similarity_threshold, 0.9, 0.8])
+    parser.add_argument('--ticks', type=int, default=200, help="ticks per loop benchmark")
+    parser.add_argument('--full', action='store_true',
+                        help="time every combination instead of varying one axis at a time around the defaults")
+    parser.add_argument('--skip-primitives', action='store_true')
+    parser.add_argument('--reward-tolerance', type=float, default=None,
+                        help="also time the approximate reward primitives at this tolerance")
+    parser.add_argument('--output', default=None, help="JSON file for the results (default: stdout)")
+    args = parser.parse_args()
+
+    base_robots, base_knowledge, base_threshold = args.robots[0], args.knowledge[0], args.thresholds[0]
+    if args.full:
+        configs = list(itertools.product(args.robots, args.knowledge, args.thresholds))
+    else:
+        configs = [(robots, base_knowledge, base_threshold) for robots in args.robots]
+        configs += [(base_robots, size, base_threshold) for size in args.knowledge[1:]]
+        configs += [(base_robots, base_knowledge, threshold) for threshold in args.thresholds[1:]]
+
+    loops = []
+    for policy in args.policies:
+        # The selfish loop has no knowledge base, so only the robot count varies
+        policy_configs = configs if policy == 'empathetic' else sorted({(robots, None, None) for robots, _, _ in configs})
+        for robots, size, threshold in policy_configs:
+            result = bench_loop(policy, robots, size, threshold, args.ticks)
+            loops.append(result)
+            print(json.dumps(result), file=sys.stderr)
+
+    report = {'environment': environment(), 'ticks': args.ticks, 'loops': loops}
+    if not args.skip_primitives:
+        report['primitives'] = bench_primitives(args.robots, args.knowledge, base_threshold,
+                                                tolerance=args.reward_tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Keeps the repository root importable from tests/, where the flat modules are imported by name
@@ -0,0 +1,441 @@
+import argparse
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pygame
+
+import knowledge
+from live import StateRing
+from profiler import NULL_PROFILER, Profiler
+from renderer import Renderer
+from results_sink import ResultsSink
+from sim_clock import SimClock
+from spatial_hash import SpatialHash
+from trajectory import TrajectoryRecorder
+from watchdog import LABELS, REASON_COLUMN, Termination, Watchdog
+from world import Mode, RobotView, World
+from zones import Zones, spawn_position
+
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+GREEN = (0, 255, 0)
+YELLOW = (255, 255, 0)
+GRAY = (169, 169, 169)
+# Colour of every mode but SEARCHING, where a robot shows its policy's base colour
+MODE_COLORS = {Mode.TARGET: GREEN, Mode.FOLLOWING: BLUE, Mode.STOPPED: GRAY}
+
+# Starting positions of the three thesis robots
+SPAWNS = ((50, 150, 'A'), (65, 250, 'B'), (80, 350, 'C'))
+
+
+@dataclass
+class SimulationConfig:
+    # Everything a run depends on apart from the policy and the seed
+    width: int = 300
+    height: int = 400
+    dt: float = 1 / 60
+    robot_size: float = 16.4
+    speed: float = 2
+    battery: float = 100
+    turn_speed: float = 0.1
+    view_distance: float = 200
+    view_angle: float = math.radians(76)
+    target_size: float = 100
+    # Start positions (x, y, identifier); robots beyond these start at random positions in spawn_regions
+    spawns: tuple = SPAWNS
+    robot_count: int = 3
+    knowledge: list = field(default_factory=lambda: [list(state) for state in knowledge.KNOWLEDGE])
+    rewards: list = field(default_factory=lambda: list(knowledge.REWARDS))
+    similarity_threshold: float = 0.96
+    # Upper bound on stored states (None = unbounded); past it new states are compacted by knowledge_policy
+    knowledge_capacity: int = None
+    knowledge_policy: str = 'merge'
+    # Storage type of the knowledge base; 'float64' reproduces runs from before it was packed in float32
+    knowledge_dtype: str = 'float32'
+    # Largest error allowed in each expected reward (None = exact); stored states are then grouped in grid cells
+    # reward_cluster_size wide and groups far enough from a state count through their centroids
+    reward_tolerance: float = None
+    reward_cluster_size: float = 0.25
+    # A run that has not finished after max_time simulated seconds is ended (None = never); one where no robot
+    # got closer to the target for stall_window seconds is ended as stalled (None = never)
+    max_time: float = 600
+    stall_window: float = None
+    # Target rects (x, y, w, h); None = one target_size square in the top-right corner
+    targets: tuple = None
+    # Safe zones (x, y, w, h); None = the two strips along the top-right target's outer edges
+    safe_zones: tuple = None
+    # Regions (x, y, w, h, weight) the robots beyond spawns start in, picked by weight; None = the lower half
+    spawn_regions: tuple = None
+
+    @property
+    def target_x(self):
+        return self.width - self.target_size
+
+    @property
+    def target_y(self):
+        return 0
+
+    def target_rects(self):
+        if self.targets is not None:
+            return [tuple(target) for target in self.targets]
+        return [(self.target_x, self.target_y, self.target_size, self.target_size)]
+
+    def safe_areas(self):
+        if self.safe_zones is not None:
+            return [pygame.Rect(*zone) for zone in self.safe_zones]
+        return [
+            pygame.Rect(self.target_x, 0, self.width - self.target_x, 5),
+            pygame.Rect(self.width - 5, 0, 5, 100),
+        ]
+
+    def spawn_areas(self):
+        if self.spawn_regions is not None:
+            return [tuple(region) for region in self.spawn_regions]
+        return [(0, self.height / 2, self.width, self.height / 2, 1)]
+
+
+class Robot(RobotView):
+    # State and sensing shared by every policy; policies subclass it for their own per-robot state.
+    # Slotted, as large swarms hold many of these per worker process
+    __slots__ = ('engine', 'identifier', 'finish_time', 'base_color')
+
+    def __init__(self, engine, x, y, color, identifier):
+        super().__init__(engine.world, engine.world.add_robot(x, y, now=engine.clock.now))
+        self.engine = engine
+        self.identifier = identifier
+        self.finish_time = None
+        self.base_color = color
+
+    # The mode is part of what the other robots perceive, so the policy hears about every change
+    @property
+    def mode(self):
+        return Mode(self.world.mode[self.index])
+
+    @mode.setter
+    def mode(self, value):
+        if value != self.world.mode[self.index]:
+            self.engine.policy.mode_changed(self)
+        self.world.mode[self.index] = value
+
+    @property
+    def color(self):
+        mode = self.world.mode[self.index]
+        return self.base_color if mode == Mode.SEARCHING else MODE_COLORS[mode]
+
+    def rotate_towards(self, target_x, target_y):
+        self.world.rotate_towards(self.index, target_x, target_y)
+
+    def is_in_safe_area(self):
+        return bool(self.engine.zones.in_safe_area(self.x, self.y))
+
+    # The engine finds the target in view of every robot once per tick, before the decisions
+    def can_see_target(self):
+        self.engine.profiler.count('can_see_target')
+        return self.engine.target_in_view[self.index] >= 0
+
+    def target_heading(self):
+        return tuple(self.engine.zones.centres[self.engine.target_in_view[self.index]].tolist())
+
+    def check_collision(self, other):
+        distance = math.hypot(self.x - other.x, self.y - other.y)
+        return distance < self.engine.config.robot_size
+
+    def avoid_collision(self, other):
+        if self.engine.verbose:
+            print("Collision!")
+        self.angle = (self.angle + math.pi / 2) % (2 * math.pi)
+
+
+class Policy:
+    # How robots decide where to go. The engine owns the world, the clock and the loop; a policy
+    # instance holds the per-run state of one simulation (e.g. the knowledge base)
+    name = None
+    robot_class = Robot
+    # SimulationConfig fields the policy never reads, so a sweep runs it once for all their values
+    ignored_fields = ()
+
+    def setup(self, engine):
+        self.engine = engine
+
+    def robot_color(self, identifier):
+        return RED
+
+    def mode_changed(self, robot):
+        pass
+
+    def on_safe(self, robot):
+        pass
+
+    def on_finish(self, robot):
+        pass
+
+    def sense(self, searching):
+        # Called once per tick before the decisions, with the mask of robots still searching
+        pass
+
+    def choose_heading(self, robot):
+        # The point to turn towards, or None when the robot should wander
+        raise NotImplementedError
+
+    def rays(self):
+        return ()
+
+    def record_samples(self, profiler):
+        pass
+
+    def robot_rewards(self):
+        # Reward each robot currently expects, recorded in trajectories; None when the policy has none
+        return None
+
+    def result_columns(self):
+        return {}
+
+
+class Engine:
+    # One simulation run of any policy. Random turns are drawn for every robot on every tick, used or not,
+    # so two policies run with the same seed see identical initial headings and random streams
+    def __init__(self, policy, config=None, seed=None, headless=True, verbose=False, render_every=1, profile=None,
+                 record=None, live=None):
+        self.policy = policy
+        self.config = config = config if config is not None else SimulationConfig()
+        self.seed = seed
+        self.headless = headless
+        self.verbose = verbose
+        self.profiler = profile if profile is not None else NULL_PROFILER
+        self.clock = SimClock(config.dt)
+        self.world = World(config.width, config.height, config.speed, config.turn_speed, config.battery,
+                           rng=np.random.default_rng(seed))
+        self.collision_grid = SpatialHash(config.robot_size)
+        self.zones = Zones(config)
+        self.target_in_view = np.full(0, -1)
+        # Targets and safe areas, drawn under the robots on every rendered frame
+        self.arena = [(GREEN, target) for target in config.target_rects()]
+        self.arena += [(GREEN, area) for area in config.safe_areas()]
+
+        self.screen = None
+        self.renderer = None
+        if not headless:
+            pygame.init()
+            self.screen = pygame.display.set_mode((config.width, config.height))
+            pygame.display.set_caption("Robot Simulation")
+            self.renderer = Renderer(self.screen, config.view_distance, config.view_angle, every=render_every)
+
+        policy.setup(self)
+        self.robots = self.spawn_robots()
+        self.entry_times = {}
+        self.unfinished = np.ones(len(self.robots), dtype=bool)
+        self.watchdog = Watchdog(config, self.unfinished.shape, self.zones)
+        self.data = None
+        self.recorder = TrajectoryRecorder(record, len(self.robots), self.run_meta()) if record is not None else None
+        self.live = StateRing.create(live, len(self.robots), self.run_meta()) if live is not None else None
+
+    def spawn_robots(self):
+        config, rng = self.config, self.world.rng
+        robots = [self.policy.robot_class(self, x, y, self.policy.robot_color(identifier), identifier)
+                  for x, y, identifier in config.spawns[:config.robot_count]]
+        for number in range(len(robots), config.robot_count):
+            x, y = spawn_position(rng, config.spawn_areas())
+            robots.append(self.policy.robot_class(self, x, y, RED, str(number + 1)))
+        return robots
+
+    def run_meta(self):
+        # Everything a replay or a live viewer needs to redraw the run without the engine
+        config = self.config
+        return {
+            'policy': self.policy.name,
+            'seed': self.seed,
+            'dt': config.dt,
+            'width': config.width,
+            'height': config.height,
+            'robot_size': config.robot_size,
+            'view_distance': config.view_distance,
+            'view_angle': config.view_angle,
+            'arena': [(color, tuple(rect)) for color, rect in self.arena],
+            'base_colors': [robot.base_color for robot in self.robots],
+            'mode_colors': {int(mode): color for mode, color in MODE_COLORS.items()},
+            'identifiers': [robot.identifier for robot in self.robots],
+        }
+
+    def record(self):
+        world, rewards = self.world, self.policy.robot_rewards()
+        if self.recorder is not None:
+            self.recorder.record(world.x, world.y, world.angle, world.battery_level, world.mode, rewards)
+        if self.live is not None:
+            self.live.publish(self.clock.ticks, world.x, world.y, world.angle, world.battery_level, world.mode, rewards)
+
+    def step(self):
+        # Advances the run by one tick; returns True once every robot has reached a safe area
+        config, world, robots, profiler = self.config, self.world, self.robots, self.profiler
+        n = len(robots)
+
+        with profiler.phase('safe_area'):
+            searching = ~self.zones.in_safe_area(world.x, world.y)
+            for robot in robots:
+                if searching[robot.index]:
+                    continue
+                world.stop(robot.index)
+                self.policy.on_safe(robot)
+                if robot.finish_time is None:
+                    robot.finish_time = round(self.clock.now, 2)
+                    self.entry_times[robot.identifier] = robot.finish_time
+                    self.unfinished[robot.index] = False
+                    if self.verbose:
+                        print(self.entry_times)
+                    self.policy.on_finish(robot)
+
+        with profiler.phase('battery'):
+            drained, died = world.update_battery(self.clock, searching)
+            for index in drained:
+                if self.verbose:
+                    print(f"Battery level of {robots[index].identifier} robot: {robots[index].battery_level:.2f}")
+            for index in died:
+                robots[index].mode = Mode.STOPPED
+
+        self.policy.sense(searching)
+
+        moving = searching & world.active
+        steer = np.zeros(n, dtype=bool)
+        heading_x = np.zeros(n)
+        heading_y = np.zeros(n)
+        with profiler.phase('decision'):
+            self.target_in_view = self.zones.visible_target(world.x, world.y, world.angle)
+            for robot in robots:
+                if moving[robot.index]:
+                    heading = self.policy.choose_heading(robot)
+                    if heading is not None:
+                        steer[robot.index] = True
+                        heading_x[robot.index], heading_y[robot.index] = heading
+
+        with profiler.phase('movement'):
+            noise = world.rng.uniform(-config.turn_speed, config.turn_speed, size=n)
+            world.step(steer, heading_x, heading_y, moving & ~steer, noise)
+
+        if self.renderer is not None and self.renderer.due(self.clock.ticks):
+            with profiler.phase('render'):
+                self.renderer.draw(world, [robot.color for robot in robots], config.robot_size, WHITE, self.arena,
+                                   rays=self.policy.rays())
+
+        with profiler.phase('collision'):
+            for i, j in zip(*world.collisions(config.robot_size, self.collision_grid)):
+                robots[i].avoid_collision(robots[j])
+                robots[j].avoid_collision(robots[i])
+
+        return not searching.any()
+
+    def result(self, reason=Termination.FINISHED):
+        time_taken = self.clock.now
+        if self.verbose and reason == Termination.FINISHED:
+            print(f"All robots have found the target in {time_taken:.2f} seconds!")
+        elif self.verbose:
+            print(f"Run ended after {time_taken:.2f} seconds: {LABELS[reason]}")
+        order = [identifier for identifier, _ in sorted(self.entry_times.items(), key=lambda x: x[1])]
+        # Robots that never arrived, and the places an arena with fewer than three robots lacks, stay empty
+        order += [None] * 3
+        battery = self.world.battery_level.tolist() + [None] * 3
+        data = {
+            'Czas symulacji': round(time_taken, 2),
+            'Poziom baterii A': battery[0],
+            'Poziom baterii B': battery[1],
+            'Poziom baterii C': battery[2],
+            'Czas robota A': self.entry_times.get('A'),
+            'Czas robota B': self.entry_times.get('B'),
+            'Czas robota C': self.entry_times.get('C'),
+            'Pierwszy robot': order[0],
+            'Drugi robot': order[1],
+            'Trzeci robot': order[2],
+        }
+        data.update(self.policy.result_columns())
+        data[REASON_COLUMN] = LABELS[reason]
+        return data
+
+    def run(self, max_ticks=None, tick_hook=None):
+        # Runs until every robot is safe or the watchdog ends the run, and returns the result row; None when the
+        # window was closed or max_ticks ran out first. tick_hook(ticks) is called after every tick, e.g. for benchmarking
+        clock = pygame.time.Clock()
+        running = True
+        while running:
+            if self.renderer is not None:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+
+            frame_due = self.renderer is not None and self.renderer.due(self.clock.ticks)
+            if self.step():
+                self.data = self.result()
+                running = False
+            else:
+                world = self.world
+                reason = self.watchdog.check(self.clock.ticks, world.x, world.y, self.unfinished, world.active)
+                if reason != Termination.RUNNING:
+                    self.data = self.result(Termination(reason))
+                    running = False
+
+            if self.recorder is not None or self.live is not None:
+                with self.profiler.phase('record'):
+                    self.record()
+            self.profiler.sample('active_robots', int(self.world.active.sum()))
+            self.policy.record_samples(self.profiler)
+            self.profiler.end_tick(self.clock.ticks)
+            self.clock.tick()
+            if tick_hook is not None:
+                tick_hook(self.clock.ticks)
+            if max_ticks is not None and self.clock.ticks >= max_ticks:
+                running = False
+
+            if frame_due:
+                pygame.display.flip()
+                clock.tick(60)
+
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.live is not None:
+            self.live.close()
+        if self.renderer is not None:
+            pygame.quit()
+            pygame.time.wait(5)
+        return self.data
+
+
+def run_simulation(policy, config=None, seed=None, headless=True, verbose=False, render_every=1,
+                   max_ticks=None, tick_hook=None, profile=None, record=None, live=None):
+    # One run of a policy instance; see Engine.run for the return value. record is a path to write the
+    # per-tick trajectory to (see trajectory.py); live names a shared-memory block a viewer can watch (see live.py)
+    engine = Engine(policy, config, seed, headless, verbose, render_every, profile, record, live)
+    return engine.run(max_ticks, tick_hook)
+
+
+def main(policy_name):
+    # Command line of the single-run scripts: one trial of the named policy, appended to the results file
+    from policies import POLICIES
+    from scenario import load_scenario
+
+    parser = argparse.ArgumentParser(description=f"Run one trial of the {policy_name} robots.")
+    parser.add_argument('--output', default=f'{policy_name}_time.csv',
+                        help="results file (.csv is appended to, .parquet needs pyarrow)")
+    parser.add_argument('--headless', action='store_true', help="no window and no frame limit")
+    parser.add_argument('--render-every', type=int, default=1,
+                        help="draw only every k-th tick when windowed, e.g. 5 to fast-forward")
+    parser.add_argument('--profile', default=None, help="write a per-tick phase profile of the run here (.json or .csv)")
+    parser.add_argument('--record', default=None, help="record every tick's robot states here for trajectory.py")
+    parser.add_argument('--live', default=None,
+                        help="publish every tick to this shared-memory name for `python live.py NAME`")
+    parser.add_argument('--quiet', action='store_true', help="keep the battery, collision and finish prints out of the loop")
+    parser.add_argument('--scenario', default=None, help="JSON scenario file with the arena, zones and spawns")
+    args = parser.parse_args()
+
+    print("Proba", 1)
+    config = load_scenario(args.scenario) if args.scenario else None
+    profile = Profiler() if args.profile else None
+    data = run_simulation(POLICIES[policy_name](), config, None, args.headless, not args.quiet, args.render_every,
+                          profile=profile, record=args.record, live=args.live)
+    if profile is not None:
+        profile.print_summary()
+        profile.save(args.profile)
+    if data is not None:
+        print(pd.DataFrame([data]))
+
+        with ResultsSink(args.output) as sink:
+            sink.write({'Strategia': policy_name, 'Proba': 1, **data})
@@ -0,0 +1,429 @@
+import itertools
+import math
+
+import numpy as np
+
+# Seed knowledge of the empathetic robots: state vectors
+# (battery, edge, target, visible robots, green robot, blue robot) and the reward of each
+KNOWLEDGE = [
+    [0.9, 0.7, 0.5, 0, 0, 0],
+    [0.5, 0, 0, 0, 0, 0],
+    [0.6, 0.9, 0.1, 0, 0, 0],
+    [0.8, 0.2, 0, 0.5, 0.3, 0],
+    [0.9, 0.8, 0.8, 0, 0, 0],
+    [0.1, 0, 0, 0, 0, 0],
+    [0.3, 0, 0, 0.5, 0.9, 0],
+    [0.7, 0.5, 0.5, 1, 0.6, 0.3],
+]
+REWARDS = [0.9, 0.3, 0.6, 0.7, 1, 0.1, 0.5, 0.8]
+
+
+def similarity(Aj, Ai):
+    n = len(Aj)
+    distance = np.sqrt(np.sum((np.asarray(Aj, dtype=float) - np.asarray(Ai, dtype=float)) ** 2) / n)
+    return 1 - distance
+
+
+def calculate_reward(Ai, A_list, r_list):
+    A_list = np.asarray(A_list, dtype=float)
+    if len(A_list) == 0:
+        return 0.0
+    distances = np.sqrt(np.mean((A_list - np.asarray(Ai, dtype=float)) ** 2, axis=1))
+    return float((1 - distances) @ np.asarray(r_list, dtype=float) / len(A_list))
+
+
+class StateIndex:
+    # Grid hash over the state space: cells are twice the search radius wide, so a query ball
+    # overlaps at most two cells per dimension (2^6 = 64 probes) however many states are stored
+    def __init__(self, threshold, n_features=6):
+        self.threshold = threshold
+        self.n_features = n_features
+        self.radius = (1 - threshold) * math.sqrt(n_features)
+        self.cell_size = 2 * self.radius
+        self.cells = {}
+
+    def _key(self, state):
+        return tuple(math.floor(v / self.cell_size) for v in state)
+
+    def insert(self, state, row):
+        if self.radius > 0:
+            self.cells.setdefault(self._key(state), []).append(row)
+
+    def remove(self, state, row):
+        if self.radius > 0:
+            self.cells[self._key(state)].remove(row)
+
+    def has_similar(self, state, states):
+        if self.radius <= 0:
+            return False
+        ranges = [range(math.floor((v - self.radius) / self.cell_size), math.floor((v + self.radius) / self.cell_size) + 1)
+                  for v in state]
+        rows = [row for key in itertools.product(*ranges) for row in self.cells.get(key, ())]
+        if not rows:
+            return False
+        diff = states[rows] - state
+        return bool((1 - np.sqrt(np.einsum('ij,ij->i', diff, diff) / self.n_features)).max() > self.threshold)
+
+
+class RewardClusters:
+    # Stored states grouped by grid cell (and reward sign), each group summarized for the far field of the
+    # expected reward: with a_i = weight * reward of its states, the centroid c weighted by |a_i|, the mass
+    # sum |a_i|, the spread sum |a_i| |x_i - c|^2 and a radius no member is farther than (distances in the
+    # root-mean-square units of similarity). As the distance d is convex and 1-Lipschitz, a query at distance
+    # D from c has every sum a_i d(q, x_i) of the group within [a D, a D + spread / (2 (D - radius))].
+    # The members of each group (row, state, squared norm, weight * reward) sit in one block of a shared
+    # pool, moved to its end when the block fills, so many groups are gathered with a few array operations
+    def __init__(self, cell_size, n_features=6, dtype=np.float32):
+        self.cell_size = cell_size
+        self.n_features = n_features
+        self.ids = {}
+        self.count = 0
+        self.pool_used = 0
+        self.pool = np.empty(256, dtype=np.int64)
+        self.pool_states = np.empty((256, n_features), dtype=dtype)
+        self.pool_sq_norms = np.empty(256)
+        self.pool_rewards = np.empty(256)
+        self._allocate(64)
+
+    def _allocate(self, rows):
+        old = {name: getattr(self, name, None) for name in ('centroids', 'sq_norms', 'signs', 'mass', 'weights',
+                                                            'spread', 'radius', 'lower', 'upper', 'sizes', 'starts',
+                                                            'capacity')}
+        self.centroids = np.zeros((rows, self.n_features))
+        self.sq_norms = np.zeros(rows)
+        self.signs = np.ones(rows)
+        self.mass = np.zeros(rows)
+        self.weights = np.zeros(rows)
+        self.spread = np.zeros(rows)
+        self.radius = np.zeros(rows)
+        self.lower = np.zeros((rows, self.n_features))
+        self.upper = np.zeros((rows, self.n_features))
+        self.sizes = np.zeros(rows, dtype=np.int64)
+        self.starts = np.zeros(rows, dtype=np.int64)
+        self.capacity = np.zeros(rows, dtype=np.int64)
+        for name, values in old.items():
+            if values is not None:
+                getattr(self, name)[:self.count] = values[:self.count]
+
+    def _cluster(self, state, reward):
+        key = tuple(math.floor(v / self.cell_size) for v in state) + (reward < 0,)
+        cluster = self.ids.get(key)
+        if cluster is None:
+            if self.count == len(self.mass):
+                self._allocate(2 * self.count)
+            cluster = self.ids[key] = self.count
+            self.centroids[cluster] = self.lower[cluster] = self.upper[cluster] = state
+            self.sq_norms[cluster] = state @ state
+            self.signs[cluster] = -1.0 if reward < 0 else 1.0
+            self.count += 1
+        return cluster
+
+    def _move(self, cluster, capacity):
+        if self.pool_used + capacity > len(self.pool):
+            rows = 2 * (self.pool_used + capacity)
+            for name in ('pool', 'pool_states', 'pool_sq_norms', 'pool_rewards'):
+                old = getattr(self, name)
+                new = np.empty((rows,) + old.shape[1:], dtype=old.dtype)
+                new[:self.pool_used] = old[:self.pool_used]
+                setattr(self, name, new)
+        block = slice(self.starts[cluster], self.starts[cluster] + self.sizes[cluster])
+        moved = slice(self.pool_used, self.pool_used + self.sizes[cluster])
+        for values in (self.pool, self.pool_states, self.pool_sq_norms, self.pool_rewards):
+            values[moved] = values[block]
+        self.starts[cluster], self.capacity[cluster] = self.pool_used, capacity
+        self.pool_used += capacity
+
+    def gather(self, clusters):
+        # Pool positions of the members of the given groups one after another, and how many each group has
+        sizes = self.sizes[clusters]
+        offsets = np.cumsum(sizes) - sizes
+        return np.repeat(self.starts[clusters] - offsets, sizes) + np.arange(sizes.sum()), sizes
+
+    def add(self, row, state, weight, reward):
+        cluster = self._cluster(state, reward)
+        if self.sizes[cluster] == self.capacity[cluster]:
+            self._move(cluster, max(4, 2 * self.sizes[cluster]))
+        slot = self.starts[cluster] + self.sizes[cluster]
+        self.pool[slot], self.pool_states[slot] = row, state
+        self.pool_sq_norms[slot], self.pool_rewards[slot] = state @ state, weight * reward
+        self.sizes[cluster] += 1
+        self.weights[cluster] += weight
+        mass = abs(weight * reward)
+        total = self.mass[cluster] + mass
+        if total > 0:
+            # Running weighted centroid and spread; the radius is the distance from the centroid to the farthest
+            # corner of the members' bounding box
+            centroid = self.centroids[cluster]
+            offset = state - centroid
+            moved = centroid + offset * (mass / total)
+            self.spread[cluster] += mass * self.mass[cluster] / total * (offset @ offset) / self.n_features
+            self.centroids[cluster] = moved
+            self.sq_norms[cluster] = moved @ moved
+            self.mass[cluster] = total
+        lower = self.lower[cluster] = np.minimum(self.lower[cluster], state)
+        upper = self.upper[cluster] = np.maximum(self.upper[cluster], state)
+        corner = np.maximum(self.centroids[cluster] - lower, upper - self.centroids[cluster])
+        self.radius[cluster] = math.sqrt(corner @ corner / self.n_features)
+
+    def remove(self, row, state, weight, reward):
+        # Takes a row out of its group and summarizes the rest anew
+        cluster = self._cluster(state, reward)
+        start = self.starts[cluster]
+        last = start + self.sizes[cluster] - 1
+        slot = start + int(np.flatnonzero(self.pool[start:last + 1] == row)[0])
+        for values in (self.pool, self.pool_states, self.pool_sq_norms, self.pool_rewards):
+            values[slot] = values[last]
+        self.sizes[cluster] -= 1
+        self.weights[cluster] -= weight
+        points = self.pool_states[start:last].astype(float)
+        mass = np.abs(self.pool_rewards[start:last])
+        self.mass[cluster] = mass.sum()
+        if self.mass[cluster] > 0:
+            self.centroids[cluster] = mass @ points / self.mass[cluster]
+        elif len(points):
+            self.centroids[cluster] = points[0]
+        centroid = self.centroids[cluster]
+        self.sq_norms[cluster] = centroid @ centroid
+        distances = np.einsum('ij,ij->i', points - centroid, points - centroid) / self.n_features
+        self.spread[cluster] = mass @ distances
+        self.radius[cluster] = math.sqrt(distances.max()) if len(points) else 0.0
+
+
+class KnowledgeBase:
+    # Stored states as one contiguous (m, n) array with parallel rewards, weights and use counts, all packed in
+    # dtype (float32 by default, half the memory of float64). Distances are taken in float64 apart from the
+    # matrix product in rewards_for, which runs in dtype against squared norms kept in float64.
+    # With a capacity the store stops growing: once full, a new state is merged into its most similar
+    # stored state ('merge') or replaces the least used one ('least_used'). The seed states are pinned.
+    # With a tolerance, expected rewards are approximated from RewardClusters: groups far enough from a query
+    # count through their centroids, the rest state by state, so each reward is within the tolerance of the
+    # exact one; error_bound holds the largest bound of the latest evaluation
+    COMPACTION_POLICIES = ('merge', 'least_used')
+
+    def __init__(self, states, rewards, similarity_threshold=None, n_features=6, chunk_size=4096,
+                 capacity=None, policy='merge', dtype=np.float32, tolerance=None, cluster_size=0.25):
+        if policy not in self.COMPACTION_POLICIES:
+            raise ValueError(f"Unknown compaction policy: {policy}")
+        if tolerance is not None and (tolerance <= 0 or cluster_size <= 0):
+            raise ValueError("tolerance and cluster_size must be positive")
+        if capacity is not None and capacity <= len(states):
+            raise ValueError("capacity must leave room beyond the pinned seed states")
+        self.n_features = n_features
+        self.chunk_size = chunk_size
+        self.capacity = capacity
+        self.policy = policy
+        self.size = 0
+        # Bumped whenever the stored states or rewards change, including when the size stays at capacity
+        self.version = 0
+        self.index = StateIndex(similarity_threshold, n_features) if similarity_threshold is not None else None
+        self.tolerance = tolerance
+        self.clusters = RewardClusters(cluster_size, n_features, dtype) if tolerance is not None else None
+        self.error_bound = 0.0
+        # Stored states (or group centroids) the latest reward evaluation measured a distance to
+        self.evaluations = 0
+        rows = max(64, len(states)) if capacity is None else capacity
+        self._states = np.empty((rows, n_features), dtype=dtype)
+        self._rewards = np.empty(rows, dtype=dtype)
+        self._sq_norms = np.empty(rows)
+        # How many appended states each row stands for, and how often it was the closest match to a scored state
+        self._weights = np.empty(rows, dtype=dtype)
+        self._uses = np.empty(rows, dtype=dtype)
+        # Version at which each row was last stored, so ties among the least used rows evict the oldest
+        self._stored_at = np.empty(rows, dtype=np.int64)
+        for state, reward in zip(states, rewards):
+            self.append(state, reward)
+        self.pinned = self.size
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def states(self):
+        return self._states[:self.size]
+
+    @property
+    def rewards(self):
+        return self._rewards[:self.size]
+
+    @property
+    def weights(self):
+        return self._weights[:self.size]
+
+    @property
+    def uses(self):
+        return self._uses[:self.size]
+
+    def _grow(self):
+        capacity = 2 * len(self._states)
+        for name in ('_states', '_rewards', '_sq_norms', '_weights', '_uses', '_stored_at'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _store(self, row, state, reward, weight, uses):
+        if self.index is not None and row < self.size:
+            self.index.remove(self._states[row], row)
+        if self.clusters is not None and row < self.size:
+            self.clusters.remove(row, self._states[row].astype(float), float(self._weights[row]),
+                                 float(self._rewards[row]))
+        self._states[row] = state
+        self._rewards[row] = reward
+        stored = self._states[row].astype(float)
+        self._sq_norms[row] = stored @ stored
+        self._weights[row] = weight
+        self._uses[row] = uses
+        self._stored_at[row] = self.version
+        if self.index is not None:
+            # Keyed by the stored (rounded) values, which are also what remove() sees later
+            self.index.insert(self._states[row], row)
+        if self.clusters is not None:
+            self.clusters.add(row, stored, float(self._weights[row]), float(self._rewards[row]))
+        self.version += 1
+
+    def append(self, state, reward):
+        state = np.asarray(state, dtype=float)
+        if self.capacity is not None and self.size == self.capacity:
+            self._compact(state, reward)
+            return
+        if self.size == len(self._states):
+            self._grow()
+        self._store(self.size, state, reward, 1.0, 0.0)
+        self.size += 1
+
+    def _compact(self, state, reward):
+        free = slice(self.pinned, self.size)
+        if self.policy == 'merge':
+            # Weighted centroid of the new state and its most similar unpinned state
+            row = self.pinned + int(self.similarities(state)[free].argmax())
+            weight = self._weights[row] + 1
+            centroid = (self._states[row] * self._weights[row] + state) / weight
+            merged_reward = (self._rewards[row] * self._weights[row] + reward) / weight
+            self._store(row, centroid, merged_reward, weight, self._uses[row])
+        else:
+            # A new row starts at the median use count, as one starting from zero would be the next one evicted
+            # while the older rows keep the counts they built up
+            uses = self._uses[free]
+            least = np.flatnonzero(uses == uses.min())
+            row = self.pinned + int(least[self._stored_at[free][least].argmin()])
+            self._store(row, state, reward, 1.0, np.median(uses))
+
+    def _count_uses(self, similarities):
+        np.add.at(self._uses, similarities.argmax(axis=-1), 1)
+
+    def has_similar(self, state, threshold=None):
+        # True when a stored state is more similar than the threshold to the given one
+        if self.index is not None and threshold in (None, self.index.threshold):
+            return self.index.has_similar(np.asarray(state, dtype=float), self._states)
+        return self.size > 0 and self.similarities(state).max() > threshold
+
+    def similarities(self, state):
+        diff = self.states - np.asarray(state, dtype=float)
+        return 1 - np.sqrt(np.einsum('ij,ij->i', diff, diff) / self.n_features)
+
+    def reward(self, state):
+        # Similarity-weighted mean reward; merged rows count once per state they absorbed
+        if self.size == 0:
+            return 0.0
+        if self.clusters is not None:
+            return float(self.rewards_for(state)[0])
+        self.evaluations = self.size
+        similarities = self.similarities(state)
+        self._count_uses(similarities)
+        return float(similarities @ (self.weights * self.rewards) / self.weights.sum())
+
+    def rewards_for(self, states):
+        states = np.atleast_2d(np.asarray(states, dtype=float))
+        if self.size == 0:
+            return np.zeros(len(states))
+        if self.clusters is not None:
+            rewards, bounds, nearest = self._approximate(states)
+            self.error_bound = float(bounds.max())
+        else:
+            rewards, nearest = self._exact(states)
+        np.add.at(self._uses, nearest, 1)
+        return rewards
+
+    def exact_rewards(self, states):
+        # Exact expected rewards of the given states, without counting uses
+        states = np.atleast_2d(np.asarray(states, dtype=float))
+        if self.size == 0:
+            return np.zeros(len(states))
+        return self._exact(states)[0]
+
+    def approximate_rewards(self, states):
+        # Approximate expected rewards of the given states and the bound on each one's error, without counting
+        # uses; needs a tolerance
+        states = np.atleast_2d(np.asarray(states, dtype=float))
+        if self.size == 0:
+            return np.zeros(len(states)), np.zeros(len(states))
+        return self._approximate(states)[:2]
+
+    def _exact(self, states):
+        # Scores many states at once: |a - b|^2 = |a|^2 + |b|^2 - 2ab turns the distances into one matrix product.
+        # Also returns the most similar stored row of each state
+        self.evaluations = len(states) * self.size
+        result, nearest = np.empty(len(states)), np.empty(len(states), dtype=np.int64)
+        weighted_rewards = self.weights * self.rewards
+        total_weight = self.weights.sum()
+        step = max(1, self.chunk_size * self.chunk_size // max(self.size, 1))
+        for start in range(0, len(states), step):
+            block = states[start:start + step]
+            cross = block.astype(self._states.dtype) @ self.states.T
+            sq = np.einsum('ij,ij->i', block, block)[:, None] + self._sq_norms[:self.size] - 2 * cross
+            similarities = 1 - np.sqrt(np.maximum(sq, 0) / self.n_features)
+            nearest[start:start + step] = similarities.argmax(axis=1)
+            result[start:start + step] = similarities @ weighted_rewards / total_weight
+        return result, nearest
+
+    def _approximate_exactly(self, states):
+        rewards, nearest = self._exact(states)
+        return rewards, np.zeros(len(states)), nearest
+
+    def _approximate(self, states):
+        clusters, k = self.clusters, self.clusters.count
+        if 2 * k > self.size:
+            # Groups of one or two states save nothing over scoring the states themselves
+            return self._approximate_exactly(states)
+        centroids, signs, mass = clusters.centroids[:k], clusters.signs[:k], clusters.mass[:k]
+        spread, radius, sizes = clusters.spread[:k], clusters.radius[:k], clusters.sizes[:k]
+        total_weight = clusters.weights[:k].sum()
+        total_mass = mass.sum()
+        total_reward = signs @ mass
+        sq = np.einsum('ij,ij->i', states, states)[:, None] + clusters.sq_norms[:k] - 2 * states @ centroids.T
+        distance = np.sqrt(np.maximum(sq, 0) / self.n_features)
+        gap = distance - radius
+        # A group is taken at its centroid when half its error range fits its share of the tolerance; the
+        # estimate sits mid-range, so the error is at most the sum of the half ranges. Empty groups cost nothing
+        # and the group that may hold the nearest state is always measured state by state, for the use counts
+        far = ((gap >= 0) & (4 * self.tolerance * total_weight * mass * gap >= spread * total_mass)) | (sizes == 0)
+        closest = np.where(sizes > 0, gap, np.inf).argmin(axis=1)
+        far[np.arange(len(states)), closest] = False
+        needed = np.flatnonzero(~far.all(axis=0))
+        if sizes[needed].sum() > self.size // 2:
+            # Most states would be measured one by one anyway, and the exact product is cheaper than gathering them
+            return self._approximate_exactly(states)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            half_range = np.where(far & (spread > 0), spread / (4 * gap), 0)
+        far_sum = np.where(far, signs * (mass * distance + half_range), 0).sum(axis=1)
+        bounds = half_range.sum(axis=1) / total_weight
+        # State by state part: the members of every group some query does not take at its centroid, scored
+        # against a block of queries with one matrix product (in float64, as distances this close cancel) and
+        # masked to the pairs that need them; blocks keep the matrix within chunk_size^2
+        slots, counts = clusters.gather(needed)
+        group = np.repeat(np.arange(len(needed)), counts)
+        points = clusters.pool_states[slots].astype(float)
+        sq_norms, weighted_rewards = clusters.pool_sq_norms[slots], clusters.pool_rewards[slots]
+        rewards, nearest = np.empty(len(states)), np.empty(len(states), dtype=np.int64)
+        self.evaluations = len(states) * k
+        step = max(1, self.chunk_size * self.chunk_size // max(len(slots), 1))
+        for start in range(0, len(states), step):
+            block = states[start:start + step]
+            sq = np.einsum('ij,ij->i', block, block)[:, None] + sq_norms - 2 * block @ points.T
+            reached = ~far[start:start + step][:, needed][:, group]
+            near = np.where(reached, np.sqrt(np.maximum(sq, 0) / self.n_features), np.inf)
+            near_sum = np.where(reached, near, 0) @ weighted_rewards
+            rewards[start:start + step] = (total_reward - far_sum[start:start + step] - near_sum) / total_weight
+            nearest[start:start + step] = clusters.pool[slots[near.argmin(axis=1)]]
+            self.evaluations += int(reached.sum())
+        return rewards, bounds, nearest
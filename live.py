@@ -0,0 +1,189 @@
+import argparse
+import json
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from trajectory import RECORD, frame_colors
+
+# Header words: ticks published, robots, slots, finished flag and the length of the JSON metadata after them
+HEADER_WORDS = 5
+ALIGN = 64
+
+
+def _layout(robots, slots, meta_len):
+    # Byte offsets of the metadata, the per-slot tick stamps and the slot data, and the total size
+    meta_offset = HEADER_WORDS * 8
+    ticks_offset = -(-(meta_offset + meta_len) // ALIGN) * ALIGN
+    data_offset = -(-(ticks_offset + slots * 8) // ALIGN) * ALIGN
+    return meta_offset, ticks_offset, data_offset, data_offset + slots * robots * RECORD.itemsize
+
+
+class StateRing:
+    # The latest ticks of a running simulation in a named shared-memory block, one slot per tick in a ring.
+    # The engine publishes every tick without waiting for anyone; viewers attach by name whenever they like,
+    # read the newest slot and simply skip the ticks they were too slow for
+    def __init__(self, memory, owner):
+        self.memory = memory
+        self.owner = owner
+        self.header = np.ndarray(HEADER_WORDS, np.int64, memory.buf)
+        _, robots, slots, _, meta_len = self.header.tolist()
+        meta_offset, ticks_offset, data_offset, _ = _layout(robots, slots, meta_len)
+        self.meta = json.loads(bytes(memory.buf[meta_offset:meta_offset + meta_len]))
+        self.robots, self.slots = robots, slots
+        self.ticks = np.ndarray(slots, np.int64, memory.buf, ticks_offset)
+        self.data = np.ndarray((slots, robots), RECORD, memory.buf, data_offset)
+
+    @classmethod
+    def create(cls, name, robots, meta=None, slots=8):
+        meta_bytes = json.dumps(meta or {}).encode()
+        size = _layout(robots, slots, len(meta_bytes))[3]
+        try:
+            memory = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            cls._remove_stale(name)
+            memory = shared_memory.SharedMemory(name, create=True, size=size)
+        meta_offset = HEADER_WORDS * 8
+        memory.buf[meta_offset:meta_offset + len(meta_bytes)] = meta_bytes
+        header = np.ndarray(HEADER_WORDS, np.int64, memory.buf)
+        header[1:] = (robots, slots, 0, len(meta_bytes))
+        del header
+        return cls(memory, owner=True)
+
+    @classmethod
+    def _remove_stale(cls, name, wait=0.5):
+        # A block left behind by a killed run is taken over; one that is still being published to is not.
+        # The killed run's resource tracker may remove the block at any moment, which is just as good
+        try:
+            ring = cls.attach(name)
+            published = int(ring.header[0])
+            time.sleep(wait)
+            live = not ring.finished and int(ring.header[0]) != published
+            ring.close()
+            if live:
+                raise FileExistsError(f"Another simulation is publishing under the name {name!r}")
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def attach(cls, name):
+        # FileNotFoundError until the engine has created the block and written its header
+        try:
+            memory = shared_memory.SharedMemory(name)
+        except ValueError:
+            raise FileNotFoundError(f"Shared-memory block {name!r} is not ready yet") from None
+        # The resource tracker would otherwise unlink the block when the viewer exits, under the running engine
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        if memory.size < HEADER_WORDS * 8 or not np.ndarray(HEADER_WORDS, np.int64, memory.buf)[2]:
+            memory.close()
+            raise FileNotFoundError(f"Shared-memory block {name!r} is not ready yet")
+        return cls(memory, owner=False)
+
+    def publish(self, tick, x, y, angle, battery, mode, reward=None):
+        # Fills the next slot and only then bumps the published count, so readers never see a half-written slot
+        published = int(self.header[0])
+        slot = published % self.slots
+        row = self.data[slot]
+        row['x'], row['y'], row['angle'], row['battery'], row['mode'] = x, y, angle, battery, mode
+        row['reward'] = np.nan if reward is None else reward
+        self.ticks[slot] = tick
+        self.header[0] = published + 1
+
+    @property
+    def finished(self):
+        return bool(self.header[3])
+
+    def latest(self):
+        # (tick, copy of every robot's state) of the newest slot, or None before the first tick. A copy that
+        # the writer may have lapped while it was being taken is thrown away and taken again
+        while True:
+            published = int(self.header[0])
+            if published == 0:
+                return None
+            slot = (published - 1) % self.slots
+            tick, frame = int(self.ticks[slot]), self.data[slot].copy()
+            if int(self.header[0]) - published < self.slots - 1:
+                return tick, frame.view(np.recarray)
+
+    def close(self):
+        if self.memory is None:
+            return
+        if self.owner:
+            self.header[3] = 1
+        del self.header, self.ticks, self.data
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+        self.memory = None
+
+
+def view(name, fps=30):
+    # Draws the newest published tick at its own frame rate until the window is closed. It waits for the
+    # engine to start, keeps the last frame once the run has finished and picks up the next run under the same name
+    import pygame
+
+    from renderer import Renderer
+
+    pygame.init()
+    ring = renderer = rects = None
+    clock = pygame.time.Clock()
+    last_tick, skipped, next_attach, running = None, 0, 0.0, True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        if (ring is None or ring.finished) and time.monotonic() >= next_attach:
+            next_attach = time.monotonic() + 1
+            try:
+                fresh = StateRing.attach(name)
+            except FileNotFoundError:
+                fresh = None
+            if fresh is not None and ring is not None and fresh.finished:
+                # Still the old run, between finishing and unlinking its block
+                fresh.close()
+            elif fresh is not None:
+                if ring is not None:
+                    ring.close()
+                ring, last_tick, skipped = fresh, None, 0
+                meta = ring.meta
+                screen = pygame.display.set_mode((meta['width'], meta['height']))
+                renderer = Renderer(screen, meta['view_distance'], meta['view_angle'])
+                rects = [(tuple(color), tuple(rect)) for color, rect in meta.get('arena', [])]
+
+        snapshot = ring.latest() if ring is not None else None
+        if snapshot is None:
+            pygame.display.set_caption(f"Waiting for {name}")
+            clock.tick(4)
+            continue
+        tick, frame = snapshot
+        if tick != last_tick:
+            if last_tick is not None and tick > last_tick:
+                skipped += tick - last_tick - 1
+            last_tick = tick
+            meta = ring.meta
+            renderer.draw(frame, frame_colors(meta, frame.mode), meta['robot_size'], (255, 255, 255), rects)
+            pygame.display.flip()
+        state = "finished" if ring.finished else "live"
+        pygame.display.set_caption(f"{name} {state}: tick {tick} ({tick * ring.meta['dt']:.2f} s), {skipped} skipped")
+        clock.tick(fps)
+
+    if ring is not None:
+        ring.close()
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a simulation started with --live NAME from another process.")
+    parser.add_argument('name', help="the name passed to --live")
+    parser.add_argument('--fps', type=int, default=30, help="viewer frame rate; ticks in between are skipped")
+    args = parser.parse_args()
+    view(args.name, args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import math
+
+import numpy as np
+
+from profiler import NULL_PROFILER
+
+
+class Visibility:
+    # In-view-cone robot pairs with their distances, built in one vectorized pass per tick.
+    # Candidate pairs come from a spatial hash when one is given, otherwise every pair is tested.
+    def __init__(self, x, y, angle, view_distance, view_angle, grid=None):
+        self.view_distance = view_distance
+        self.n = n = len(x)
+        if grid is not None:
+            first, second = grid.candidate_pairs(x, y)
+        else:
+            first, second = np.triu_indices(n, k=1)
+        # Test each unordered pair in both directions
+        src = np.concatenate([first, second])
+        dst = np.concatenate([second, first])
+
+        dx = x[dst] - x[src]
+        dy = y[dst] - y[src]
+        distance = np.hypot(dx, dy)
+        angle_diff = (np.arctan2(dy, dx) - angle[src]) % (2 * math.pi)
+        angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+        visible = (distance <= view_distance) & (np.abs(angle_diff) <= view_angle / 2)
+
+        # Visible pairs sorted by observer, then by the observed robot's index
+        order = np.lexsort((dst[visible], src[visible]))
+        self.src = src[visible][order]
+        self.dst = dst[visible][order]
+        self.distance = distance[visible][order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.src, minlength=n))])
+
+    def __len__(self):
+        return self.n
+
+    def _rows(self, index):
+        # Pair positions belonging to one observer, or all of them
+        if isinstance(index, slice):
+            return slice(None)
+        return slice(self.indptr[index], self.indptr[index + 1])
+
+    # Queries below answer for every robot, or for one robot when index is given
+
+    def sees(self, index, other):
+        return bool(np.any(self.visible_from(index) == other))
+
+    def visible_from(self, index):
+        return self.dst[self._rows(index)]
+
+    def matrix(self):
+        visible = np.zeros((self.n, self.n), dtype=bool)
+        visible[self.src, self.dst] = True
+        return visible
+
+    def sees_any(self, mask=None, index=slice(None)):
+        rows = self._rows(index)
+        hits = np.ones(len(self.dst[rows]), dtype=bool) if mask is None else np.asarray(mask)[self.dst[rows]]
+        if isinstance(index, slice):
+            return np.bincount(self.src[hits], minlength=self.n) > 0
+        return hits.any()
+
+    def visible_fraction(self, index=slice(None)):
+        others = self.n - 1
+        if isinstance(index, slice):
+            counts = np.diff(self.indptr)
+        else:
+            counts = np.asarray(self.indptr[index + 1] - self.indptr[index])
+        if others <= 0:
+            return np.zeros_like(counts, dtype=float)
+        return np.round(counts / others, 2)
+
+    def nearest(self, mask, index=slice(None)):
+        # Nearest visible robot from mask strictly closer than the view distance; -1 when there is none
+        rows = self._rows(index)
+        src, dst, distance = self.src[rows], self.dst[rows], self.distance[rows]
+        keep = np.asarray(mask)[dst] & (distance < self.view_distance)
+        src, dst, distance = src[keep], dst[keep], distance[keep]
+        # Ties go to the lowest index, as in a scan over the robot list
+        order = np.lexsort((dst, distance, src))
+        src, dst, distance = src[order], dst[order], distance[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = src[1:] != src[:-1]
+
+        if not isinstance(index, slice):
+            if len(dst) == 0:
+                return np.asarray(-1), np.asarray(float(self.view_distance))
+            return np.asarray(dst[0]), np.asarray(distance[0])
+        nearest = np.full(self.n, -1)
+        nearest_distance = np.full(self.n, float(self.view_distance))
+        nearest[src[first]] = dst[first]
+        nearest_distance[src[first]] = distance[first]
+        return nearest, nearest_distance
+
+    def proximity(self, mask, index=slice(None)):
+        nearest, distance = self.nearest(mask, index)
+        return np.where(nearest >= 0, 1 - distance / self.view_distance, 0.0)
+
+
+def cast_rays(x, y, angle, width, height):
+    # Distance from each robot along each ray to the first arena wall, for every robot and ray at once.
+    # x and y have shape (n,), angle (n,) or (n, k); a ray parallel to a wall never reaches it, so that
+    # wall counts as infinitely far instead of dividing by a zero cosine or sine
+    angle = np.asarray(angle, dtype=float)
+    x = np.asarray(x, dtype=float).reshape((-1,) + (1,) * (angle.ndim - 1))
+    y = np.asarray(y, dtype=float).reshape((-1,) + (1,) * (angle.ndim - 1))
+    cos, sin = np.cos(angle), np.sin(angle)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        to_vertical = np.where(cos > 0, (width - x) / cos, np.where(cos < 0, x / -cos, np.inf))
+        to_horizontal = np.where(sin > 0, (height - y) / sin, np.where(sin < 0, y / -sin, np.inf))
+    return np.minimum(to_vertical, to_horizontal)
+
+
+def ray_ends(x, y, angle, distance):
+    # End points of rays of the given lengths
+    return x + distance * np.cos(angle), y + distance * np.sin(angle)
+
+
+class PerceptionCache:
+    # Each robot's state vector and reward, worked out once and reused until the world changes. The knowledge
+    # base grows between robots while sensing, so rewards also remember the knowledge version they were scored at
+    def __init__(self, world, knowledge_base, perceive_all, view_distance, view_angle, grid=None, profiler=NULL_PROFILER):
+        self.world = world
+        self.profiler = profiler
+        self.grid = grid
+        self.knowledge_base = knowledge_base
+        self.perceive_all = perceive_all
+        self.view_distance = view_distance
+        self.view_angle = view_angle
+        self.states_version = None
+        self.rewards_key = None
+        self.visibility_version = None
+        self.states = np.zeros((0, knowledge_base.n_features))
+        self.rewards = np.zeros(0)
+        self.reward_versions = np.zeros(0, dtype=np.int64)
+        self._visibility = None
+
+    def invalidate(self):
+        self.states_version = None
+        self.rewards_key = None
+
+    def visibility(self):
+        if self.visibility_version != self.world.version:
+            world = self.world
+            self.profiler.count('visibility')
+            self._visibility = Visibility(world.x, world.y, world.angle, self.view_distance, self.view_angle, self.grid)
+            self.visibility_version = world.version
+        return self._visibility
+
+    def refresh(self, robots, index):
+        # States and rewards with the given robot's reward up to date. The whole swarm is scored once per world
+        # change; when only the knowledge base changed since, just the requesting robot is scored again
+        if self.states_version != self.world.version:
+            with self.profiler.phase('perception'):
+                self.states = np.asarray(self.perceive_all(robots), dtype=float)
+            self.states_version = self.world.version
+            self.rewards_key = None
+        knowledge_base = self.knowledge_base
+        if self.rewards_key != self.states_version:
+            with self.profiler.phase('reward'):
+                self.rewards = knowledge_base.rewards_for(self.states)
+            self.profiler.count('similarity', knowledge_base.evaluations)
+            self.reward_versions = np.full(len(self.states), knowledge_base.version)
+            self.rewards_key = self.states_version
+        elif self.reward_versions[index] != knowledge_base.version:
+            with self.profiler.phase('reward'):
+                self.rewards[index] = knowledge_base.rewards_for(self.states[index:index + 1])[0]
+            self.profiler.count('similarity', knowledge_base.evaluations)
+            self.reward_versions[index] = knowledge_base.version
+        return self.states, self.rewards
@@ -0,0 +1,312 @@
+import math
+
+import numpy as np
+
+import knowledge
+from engine import BLUE, RED, YELLOW, Policy, Robot
+from knowledge import KnowledgeBase
+from perception import PerceptionCache, cast_rays, ray_ends
+from spatial_hash import SpatialHash
+from world import Mode
+
+
+class SelfishRobot(Robot):
+    __slots__ = ()
+
+
+class SelfishPolicy(Policy):
+    # Head for the target once it is in view, otherwise wander
+    name = 'selfish'
+    robot_class = SelfishRobot
+    ignored_fields = ('knowledge', 'rewards', 'similarity_threshold', 'knowledge_capacity', 'knowledge_policy',
+                      'knowledge_dtype', 'reward_tolerance', 'reward_cluster_size')
+    COLORS = {'A': RED, 'B': BLUE, 'C': YELLOW}
+
+    def robot_color(self, identifier):
+        return self.COLORS.get(identifier, RED)
+
+    def choose_heading(self, robot):
+        if robot.can_see_target():
+            return robot.target_heading()
+        return None
+
+
+class EmpatheticRobot(Robot):
+    __slots__ = ('knowledge', 'current_stage', 'empatyczne', 'skipped_states_count', 'analyzed_states_count',
+                 'edge_ray')
+
+    def __init__(self, engine, x, y, color, identifier):
+        super().__init__(engine, x, y, color, identifier)
+        self.knowledge = engine.policy.knowledge_base
+        self.current_stage = 0
+        self.empatyczne = 0
+        self.skipped_states_count = 0
+        self.analyzed_states_count = 0
+        self.edge_ray = None
+
+    @property
+    def perception(self):
+        return self.engine.policy.perception
+
+    # The reward and whether the target was in view live in the policy's arrays, so the decisions can
+    # compare the visible robots in one step
+    @property
+    def current_reward(self):
+        return self.engine.policy.rewards[self.index]
+
+    @current_reward.setter
+    def current_reward(self, value):
+        self.engine.policy.rewards[self.index] = value
+
+    @property
+    def see_target(self):
+        return bool(self.engine.policy.see_target[self.index])
+
+    @see_target.setter
+    def see_target(self, value):
+        self.engine.policy.see_target[self.index] = value
+
+    def similarity(self, Aj, Ai):
+        return knowledge.similarity(Aj, Ai)
+
+    def calculate_reward(self, Ai, A_list, r_list):
+        return knowledge.calculate_reward(Ai, A_list, r_list)
+
+    # Returns the point to turn towards, or None when the robot should wander
+    def choose_heading(self, robots):
+        if self.can_see_target():
+            self.mode = Mode.TARGET
+            self.see_target = True
+            return self.target_heading()
+
+        target_robot = self.find_robot_to_follow(robots)
+        if target_robot:
+            self.mode = Mode.FOLLOWING
+            self.empatyczne = 1
+            self.see_target = False
+            return target_robot.x, target_robot.y
+
+        self.mode = Mode.SEARCHING
+        self.see_target = False
+        return None
+
+    # The first visible robot (by index) that is heading for the target, or that saw it and expects a higher
+    # reward. rewards replaces the robots' current rewards, e.g. to compare reward estimates (see reward_drift.py)
+    def find_robot_to_follow(self, robots, rewards=None):
+        policy = self.engine.policy
+        rewards = policy.rewards if rewards is None else np.asarray(rewards)
+        visible = self.perception.visibility().visible_from(self.index)
+        follow = (self.world.mode[visible] == Mode.TARGET) | \
+            (policy.see_target[visible] & (rewards[visible] > rewards[self.index]))
+        hits = np.flatnonzero(follow)
+        return robots[visible[hits[0]]] if len(hits) else None
+
+    def can_see_robot(self, other):
+        return self.perception.visibility().sees(self.index, other.index)
+
+    def calculate_distances_to_edges(self):
+        config = self.engine.config
+        angles = (self.angle + np.array([-config.view_angle / 2, 0, config.view_angle / 2])) % (2 * math.pi)
+        distances = cast_rays(self.x, self.y, angles, config.width, config.height)
+        return list(zip(distances.tolist(), angles.tolist()))
+
+    def vector_to_edges(self):
+        # Only the left edge of the view cone counts, as in the original per-ray loop
+        distance, angle = self.calculate_distances_to_edges()[0]
+        self.edge_ray = None
+        if distance < self.engine.config.view_distance:
+            # Kept for the renderer, which draws the ray instead of perception doing it
+            self.edge_ray = ((self.x, self.y), tuple(t.item() for t in ray_ends(self.x, self.y, angle, distance)))
+            return np.round(1 - distance / 150, 2).item()
+        return 0
+
+    def calculate_distance_to_target(self):
+        return self.engine.zones.target_distance(self.x, self.y).item()
+
+    def vector_to_target(self):
+        distance = self.calculate_distance_to_target()
+        view_distance = self.engine.config.view_distance
+
+        if distance < view_distance:
+            vector_to_target = 1 - (distance / view_distance)
+        else:
+            vector_to_target = 0  # Target is out of the visibility range
+        return round(vector_to_target, 2)
+
+    def can_see_green_robot(self, robots):
+        return bool(self.perception.visibility().sees_any(self.world.mode == Mode.TARGET, self.index))
+
+    def can_see_blue_robot(self, robots):
+        return bool(self.perception.visibility().sees_any(self.world.mode == Mode.FOLLOWING, self.index))
+
+    def can_see_any_robot(self, robots):
+        return bool(self.perception.visibility().sees_any(index=self.index))
+
+    def count_visible_robots(self, robots):
+        return self.perception.visibility().visible_fraction(self.index).item()
+
+    def find_nearest_robot_in_mode(self, robots, mode):
+        nearest, min_distance = self.perception.visibility().nearest(self.world.mode == mode, self.index)
+        nearest_robot = robots[nearest] if nearest >= 0 else None
+        return nearest_robot, min_distance.item()
+
+    def vector_blue_robot(self, robots):
+        return self.perception.visibility().proximity(self.world.mode == Mode.FOLLOWING, self.index).item()
+
+    def vector_green_robot(self, robots):
+        return round(self.perception.visibility().proximity(self.world.mode == Mode.TARGET, self.index).item(), 2)
+
+    def evaluate_actions(self, new_state):
+        profiler = self.engine.profiler
+        if len(self.knowledge) == 0:
+            self.knowledge.append(new_state, 0.0)
+            return
+
+        profiler.count('has_similar')
+        with profiler.phase('dedup'):
+            similar = self.knowledge.has_similar(new_state, self.engine.config.similarity_threshold)
+        if similar:
+            self.skipped_states_count += 1
+            return
+
+        with profiler.phase('reward'):
+            reward = self.knowledge.reward(new_state)
+        profiler.count('similarity', self.knowledge.evaluations)
+        with profiler.phase('knowledge'):
+            self.knowledge.append(new_state, reward)
+        self.analyzed_states_count += 1
+
+    def perceive(self, robots):
+        current_vectors = {
+            'battery': self.battery_level,
+            'to_edge': self.vector_to_edges(),
+            'to_target': self.vector_to_target(),
+            'count_robots': self.count_visible_robots(robots),
+            'to_green_robot': self.vector_green_robot(robots),
+            'to_blue_robot': self.vector_blue_robot(robots)
+        }
+        return list(current_vectors.values())
+
+    def current_knowledge(self, robots):
+        self.current_rewards(robots)
+        # Przeprowadzamy ocenę działań na podstawie obecnego stanu
+        self.evaluate_actions(self.current_stage)
+
+    # Funkcja do aktualizacji nagrody na podstawie bieżącego stanu
+    def current_rewards(self, robots):
+        states, rewards = self.perception.refresh(robots, self.index)
+        self.current_stage = states[self.index]
+        self.current_reward = rewards[self.index]
+
+
+class EmpatheticPolicy(Policy):
+    # Head for the target once it is in view, otherwise follow a visible robot that sees it (green) or
+    # expects a higher reward; every perceived state is scored against the shared knowledge base
+    name = 'empathetic'
+    robot_class = EmpatheticRobot
+
+    def setup(self, engine):
+        super().setup(engine)
+        config = engine.config
+        self.knowledge_base = KnowledgeBase(config.knowledge, config.rewards,
+                                            similarity_threshold=config.similarity_threshold,
+                                            capacity=config.knowledge_capacity, policy=config.knowledge_policy,
+                                            dtype=config.knowledge_dtype, tolerance=config.reward_tolerance,
+                                            cluster_size=config.reward_cluster_size)
+        self.perception = PerceptionCache(engine.world, self.knowledge_base, self.perceive_all,
+                                          config.view_distance, config.view_angle,
+                                          SpatialHash(config.view_distance), engine.profiler)
+        self.rewards = np.zeros(config.robot_count)
+        self.see_target = np.zeros(config.robot_count, dtype=bool)
+        self.amount_of_knowledge = {}
+        self.number_of_omitted = {}
+        self.edge_rays = []
+
+    # Mode changes alter what the other robots perceive, so they invalidate the cached states
+    def mode_changed(self, robot):
+        self.perception.invalidate()
+
+    def on_safe(self, robot):
+        robot.mode = Mode.STOPPED
+
+    def on_finish(self, robot):
+        self.amount_of_knowledge[robot.identifier] = len(robot.knowledge)
+        self.number_of_omitted[robot.identifier] = robot.skipped_states_count
+        total_states = robot.analyzed_states_count + robot.skipped_states_count
+        # A robot that starts in a safe area finishes before it has seen a single state
+        if self.engine.verbose and total_states:
+            print("Procent", robot.identifier, round((robot.skipped_states_count/total_states)*100,2))
+
+    def sense(self, searching):
+        # Every robot's state and reward are computed once here and read from the cache afterwards;
+        # the cache and evaluate_actions time their own perception, reward and dedup phases
+        robots = self.engine.robots
+        for robot in robots:
+            if searching[robot.index]:
+                robot.current_knowledge(robots)
+
+    def choose_heading(self, robot):
+        return robot.choose_heading(self.engine.robots)
+
+    # State vectors of all robots at once; the robot-to-robot features are reductions on the visibility matrix
+    def perceive_all(self, robots):
+        world, visibility = self.engine.world, self.perception.visibility()
+        return np.column_stack([
+            world.battery_level,
+            self.edge_features(),
+            self.target_features(),
+            visibility.visible_fraction(),
+            np.round(visibility.proximity(world.mode == Mode.TARGET), 2),
+            visibility.proximity(world.mode == Mode.FOLLOWING),
+        ])
+
+    # to_edge of every robot from one cast of the three view-cone rays per robot; only the left ray counts,
+    # as in the original per-robot loop. The rays that hit a wall within view are kept for the renderer
+    def edge_features(self):
+        world, config = self.engine.world, self.engine.config
+        offsets = np.array([-config.view_angle / 2, 0, config.view_angle / 2])
+        angles = (world.angle[:, None] + offsets) % (2 * math.pi)
+        distance = cast_rays(world.x, world.y, angles, config.width, config.height)[:, 0]
+        near = distance < config.view_distance
+        x, y = world.x[near], world.y[near]
+        end_x, end_y = ray_ends(x, y, angles[near, 0], distance[near])
+        self.edge_rays = list(zip(zip(x.tolist(), y.tolist()), zip(end_x.tolist(), end_y.tolist())))
+        return np.where(near, np.round(1 - distance / 150, 2), 0)
+
+    # to_target of every robot: closeness to the nearest target within view distance, rounded as vector_to_target
+    def target_features(self):
+        world, view_distance = self.engine.world, self.engine.config.view_distance
+        distance = self.engine.zones.target_distance(world.x, world.y)
+        return np.round(np.where(distance < view_distance, 1 - distance / view_distance, 0), 2)
+
+    def rays(self):
+        return self.edge_rays
+
+    def record_samples(self, profiler):
+        profiler.sample('knowledge_size', len(self.knowledge_base))
+        if self.knowledge_base.tolerance is not None:
+            profiler.sample('reward_error_bound', self.knowledge_base.error_bound)
+
+    def robot_rewards(self):
+        return self.rewards.tolist()
+
+    def result_columns(self):
+        robots = self.engine.robots
+        suma_empatycznych = sum(robot.empatyczne for robot in robots)
+        if self.engine.verbose:
+            print("Suma empatyczna:", suma_empatycznych)
+        return {
+            'Wiedza A': self.amount_of_knowledge.get('A'),
+            'Wiedza B': self.amount_of_knowledge.get('B'),
+            'Wiedza C': self.amount_of_knowledge.get('C'),
+            'Zachowania empatyczne': suma_empatycznych,
+            'Pominięte stany A': self.number_of_omitted.get('A'),
+            'Pominięte stany B': self.number_of_omitted.get('B'),
+            'Pominięte stany C': self.number_of_omitted.get('C')
+        }
+
+
+POLICIES = {
+    'selfish': SelfishPolicy,
+    'empathetic': EmpatheticPolicy,
+}
@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+import time
+from collections import Counter, defaultdict
+
+
+class _Phase:
+    # Reusable context manager that adds its elapsed time to one phase of the current tick
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.phases[self.name] += time.perf_counter() - self.start
+
+
+class Profiler:
+    # Per-tick phase timings, call counters and sampled values (e.g. knowledge-base size) of one run.
+    # Phases must not be nested, so every second of a tick is attributed to exactly one phase
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.counts = Counter()
+        self.samples = {}
+        self.ticks = []
+        self._phase_objects = {}
+
+    def phase(self, name):
+        phase = self._phase_objects.get(name)
+        if phase is None:
+            phase = self._phase_objects[name] = _Phase(self, name)
+        return phase
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def sample(self, name, value):
+        self.samples[name] = value
+
+    def end_tick(self, tick):
+        self.ticks.append({'tick': tick, 'phases': dict(self.phases), 'counts': dict(self.counts), 'samples': self.samples})
+        self.phases = defaultdict(float)
+        self.counts = Counter()
+        self.samples = {}
+
+    def summary(self):
+        totals = defaultdict(float)
+        counts = Counter()
+        for row in self.ticks:
+            for name, seconds in row['phases'].items():
+                totals[name] += seconds
+            counts.update(row['counts'])
+        total = sum(totals.values())
+        ticks = max(len(self.ticks), 1)
+        return {
+            'ticks': len(self.ticks),
+            'phases': {
+                name: {'total_s': seconds, 'mean_ms': seconds / ticks * 1000, 'share': seconds / total if total else 0.0}
+                for name, seconds in sorted(totals.items(), key=lambda item: -item[1])
+            },
+            'counts': dict(counts),
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"Profile over {summary['ticks']} ticks:")
+        for name, phase in summary['phases'].items():
+            print(f"  {name:<16} {phase['mean_ms']:8.3f} ms/tick  {phase['share']:6.1%}")
+        for name, count in summary['counts'].items():
+            print(f"  {name:<16} {count} calls")
+
+    def save(self, path):
+        # .csv writes one row per tick; anything else gets the JSON profile with the summary
+        if os.path.splitext(path)[1].lower() == '.csv':
+            self.to_csv(path)
+        else:
+            self.to_json(path)
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'ticks': self.ticks}, f, indent=1)
+
+    def to_csv(self, path):
+        phases = sorted({name for row in self.ticks for name in row['phases']})
+        counts = sorted({name for row in self.ticks for name in row['counts']})
+        samples = sorted({name for row in self.ticks for name in row['samples']})
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['tick'] + [f'{name}_s' for name in phases] + [f'{name}_calls' for name in counts] + samples)
+            for row in self.ticks:
+                writer.writerow([row['tick']]
+                                + [row['phases'].get(name, 0.0) for name in phases]
+                                + [row['counts'].get(name, 0) for name in counts]
+                                + [row['samples'].get(name, '') for name in samples])
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+class NullProfiler:
+    # Stand-in used when profiling is off; every call is a no-op
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def sample(self, name, value):
+        pass
+
+    def end_tick(self, tick):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,46 @@
+import numpy as np
+import pygame
+
+
+class Renderer:
+    # Draws the arena from the World arrays. The translucent overlay and the view arc are built once
+    # and reused, so a frame costs one full-screen blit however many robots there are
+    def __init__(self, screen, view_distance, view_angle, arc_points=20, every=1):
+        self.screen = screen
+        self.every = max(1, int(every))
+        self.overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        # View arc of a robot at the origin facing angle 0; per robot it is only rotated and translated
+        offsets = np.linspace(-view_angle / 2, view_angle / 2, arc_points + 1)
+        self.arc = np.column_stack([np.cos(offsets), np.sin(offsets)]) * view_distance
+
+    def due(self, tick):
+        # Draw only every k-th simulation tick
+        return tick % self.every == 0
+
+    def view_cones(self, x, y, angle):
+        # Polygon (apex followed by the arc) of every robot's field of view, shape (n, arc_points + 2, 2)
+        cos, sin = np.cos(angle)[:, None], np.sin(angle)[:, None]
+        arc_x = x[:, None] + self.arc[:, 0] * cos - self.arc[:, 1] * sin
+        arc_y = y[:, None] + self.arc[:, 0] * sin + self.arc[:, 1] * cos
+        apex = np.stack([x, y], axis=1)[:, None, :]
+        return np.concatenate([apex, np.stack([arc_x, arc_y], axis=2)], axis=1)
+
+    def draw(self, world, colors, robot_size, fill, rects, rays=(), ray_color=(0, 0, 255)):
+        # rects are (colour, rect) pairs drawn over the fill colour, e.g. the target and the safe areas
+        self.screen.fill(fill)
+        for color, rect in rects:
+            pygame.draw.rect(self.screen, color, rect)
+
+        for x, y, color in zip(world.x, world.y, colors):
+            pygame.draw.circle(self.screen, color, (int(x), int(y)), robot_size / 2)
+
+        cones = self.view_cones(world.x, world.y, world.angle).tolist()
+        self.overlay.fill((0, 0, 0, 0))
+        for points in cones:
+            pygame.draw.polygon(self.overlay, (0, 0, 0, 50), points)
+        self.screen.blit(self.overlay, (0, 0))
+        for points in cones:
+            pygame.draw.polygon(self.screen, (0, 0, 0), points, 1)  #1 definiuje gruboiść obramowania
+
+        for start, end in rays:
+            pygame.draw.line(self.screen, ray_color, start, end, 1)
@@ -0,0 +1,262 @@
+import math
+import numbers
+from collections import Counter
+
+import numpy as np
+from scipy import stats
+
+from watchdog import LABELS, REASON_COLUMN, Termination
+
+ORDER_COLUMNS = ('Pierwszy robot', 'Drugi robot', 'Trzeci robot')
+
+
+class RunningStats:
+    # Welford's online mean/variance, extended with the third and fourth central moments for skewness and kurtosis
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        if value is None or value != value:  # skip missing values (None/NaN)
+            return
+        value = float(value)
+        n1 = self.count
+        self.count += 1
+        n = self.count
+        delta = value - self.mean
+        delta_n = delta / n
+        term = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term * delta_n * delta_n * (n * n - 3 * n + 3) + 6 * delta_n * delta_n * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def sem(self):
+        return self.std / math.sqrt(self.count) if self.count > 1 else math.nan
+
+    @property
+    def skewness(self):
+        return math.sqrt(self.count) * self.m3 / self.m2 ** 1.5 if self.m2 > 0 else math.nan
+
+    @property
+    def kurtosis(self):
+        # Excess kurtosis, 0 for a normal distribution
+        return self.count * self.m4 / (self.m2 * self.m2) - 3 if self.m2 > 0 else math.nan
+
+    def summary(self):
+        return {'n': self.count, 'mean': self.mean, 'std': self.std, 'min': self.min, 'max': self.max}
+
+
+class Reservoir:
+    # Fixed-size uniform sample of a stream (Algorithm R), enough for Shapiro-Wilk on any number of trials
+    def __init__(self, size=5000, seed=0):
+        self.size = size
+        self.seen = 0
+        self.values = []
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, value):
+        if value is None or value != value:
+            return
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(float(value))
+        else:
+            slot = self.rng.integers(self.seen)
+            if slot < self.size:
+                self.values[slot] = float(value)
+
+
+def finished(record):
+    # Runs the watchdog ended only say how long it waited, so they stay out of the timing statistics
+    return record.get(REASON_COLUMN, LABELS[Termination.FINISHED]) == LABELS[Termination.FINISHED]
+
+
+class PolicyStats:
+    # Running aggregates of every numeric column of one policy's finished runs, plus finish-order and
+    # termination-reason counts over all of them
+    def __init__(self, metric='Czas symulacji', sample_size=5000):
+        self.metric = metric
+        self.columns = {}
+        self.finish_order = {column: Counter() for column in ORDER_COLUMNS}
+        self.terminations = Counter()
+        self.sample = Reservoir(sample_size)
+
+    def add(self, record):
+        self.terminations[record.get(REASON_COLUMN, LABELS[Termination.FINISHED])] += 1
+        if not finished(record):
+            return
+        for column, value in record.items():
+            if column in ORDER_COLUMNS:
+                self.finish_order[column][value] += 1
+            elif isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)) and column not in ('Proba', 'Ziarno'):
+                self.columns.setdefault(column, RunningStats()).update(value)
+        self.sample.update(record.get(self.metric))
+
+    @property
+    def count(self):
+        return self.columns[self.metric].count if self.metric in self.columns else 0
+
+    def normality(self):
+        # Shapiro-Wilk on the reservoir sample and Jarque-Bera from the streamed moments
+        values = self.sample.values
+        metric = self.columns.get(self.metric, RunningStats())
+        result = {'skewness': metric.skewness, 'kurtosis': metric.kurtosis}
+        if metric.count >= 3 and metric.m2 > 0:
+            result['shapiro_w'], result['shapiro_p'] = stats.shapiro(values)
+            jb = metric.count / 6 * (metric.skewness ** 2 + metric.kurtosis ** 2 / 4)
+            result['jarque_bera'], result['jarque_bera_p'] = jb, stats.chi2.sf(jb, 2)
+        return result
+
+
+class Comparison:
+    # Streams trial records of several policies and compares one metric between two of them.
+    # Records of the two policies with the same trial number (same seed) are also paired, for the paired t-test
+    def __init__(self, metric='Czas symulacji', baseline='selfish', treatment='empathetic'):
+        self.metric = metric
+        self.baseline = baseline
+        self.treatment = treatment
+        self.policies = {}
+        self.differences = RunningStats()
+        self._unpaired = {}
+
+    def add(self, record):
+        policy = record.get('Strategia')
+        self.policies.setdefault(policy, PolicyStats(self.metric)).add(record)
+        if not finished(record):
+            return
+        if policy in (self.baseline, self.treatment) and record.get('Proba') is not None:
+            partner = self._unpaired.pop(record['Proba'], None)
+            if partner is None:
+                self._unpaired[record['Proba']] = (policy, record.get(self.metric))
+            elif partner[0] != policy:
+                values = {partner[0]: partner[1], policy: record.get(self.metric)}
+                self.differences.update(values[self.treatment] - values[self.baseline])
+
+    def _metric(self, policy):
+        policy_stats = self.policies.get(policy)
+        if policy_stats is None or self.metric not in policy_stats.columns:
+            return RunningStats()
+        return policy_stats.columns[self.metric]
+
+    def welch(self, confidence=0.95):
+        # Welch's unequal-variance t-test (what ttest_ind(treatment, baseline, equal_var=False) computes) from the
+        # running moments, with the confidence interval of treatment mean minus baseline mean
+        a, b = self._metric(self.baseline), self._metric(self.treatment)
+        if a.count < 2 or b.count < 2:
+            return None
+        va, vb = a.variance / a.count, b.variance / b.count
+        se = math.sqrt(va + vb)
+        difference = b.mean - a.mean
+        if se == 0:
+            return {'difference': difference, 't': math.nan, 'df': math.nan, 'p': math.nan,
+                    'ci_low': difference, 'ci_high': difference}
+        df = (va + vb) ** 2 / (va ** 2 / (a.count - 1) + vb ** 2 / (b.count - 1))
+        t = difference / se
+        half_width = stats.t.ppf(0.5 + confidence / 2, df) * se
+        return {
+            'difference': difference,
+            't': t,
+            'df': df,
+            'p': 2 * stats.t.sf(abs(t), df),
+            'ci_low': difference - half_width,
+            'ci_high': difference + half_width,
+        }
+
+    def paired(self, confidence=0.95):
+        # Paired t-test on the per-seed differences (treatment - baseline); with common random numbers the
+        # shared randomness cancels out of each difference, so far fewer trials are needed than for Welch
+        d = self.differences
+        if d.count < 2:
+            return None
+        if d.sem == 0:
+            return {'difference': d.mean, 'pairs': d.count, 't': math.nan, 'df': d.count - 1, 'p': math.nan,
+                    'ci_low': d.mean, 'ci_high': d.mean}
+        t = d.mean / d.sem
+        df = d.count - 1
+        half_width = stats.t.ppf(0.5 + confidence / 2, df) * d.sem
+        return {
+            'difference': d.mean,
+            'pairs': d.count,
+            't': t,
+            'df': df,
+            'p': 2 * stats.t.sf(abs(t), df),
+            'ci_low': d.mean - half_width,
+            'ci_high': d.mean + half_width,
+        }
+
+    def should_stop(self, alpha=None, ci_width=None, min_trials=30, confidence=0.95, paired=False):
+        # True once both policies have min_trials results (pairs, for the paired test) and the test is significant
+        # at alpha or the confidence interval of the difference is narrower than ci_width. Checking after every
+        # trial inflates the false-positive rate, so keep min_trials high and alpha conservative
+        if alpha is None and ci_width is None:
+            return False
+        if paired:
+            if self.differences.count < min_trials:
+                return False
+            test = self.paired(confidence)
+        elif min(self._metric(self.baseline).count, self._metric(self.treatment).count) < min_trials:
+            return False
+        else:
+            test = self.welch(confidence)
+        if test is None:
+            return False
+        if alpha is not None and test['p'] < alpha:
+            return True
+        return ci_width is not None and test['ci_high'] - test['ci_low'] <= ci_width
+
+    def report(self, confidence=0.95):
+        return {
+            'policies': {
+                policy: {
+                    'columns': {column: running.summary() for column, running in policy_stats.columns.items()},
+                    'finish_order': {column: dict(counts) for column, counts in policy_stats.finish_order.items()},
+                    'terminations': dict(policy_stats.terminations),
+                    'normality': policy_stats.normality(),
+                }
+                for policy, policy_stats in self.policies.items()
+            },
+            'welch': self.welch(confidence),
+            'paired': self.paired(confidence),
+        }
+
+    def print_report(self, confidence=0.95):
+        report = self.report(confidence)
+        for policy, summary in report['policies'].items():
+            metric = summary['columns'].get(self.metric)
+            ended = {reason: count for reason, count in summary['terminations'].items()
+                     if reason != LABELS[Termination.FINISHED]}
+            if metric is None:
+                if ended:
+                    print(f"{policy}: no finished runs, {REASON_COLUMN}: {ended}")
+                continue
+            print(f"{policy}: n={metric['n']} mean={metric['mean']:.2f} std={metric['std']:.2f}")
+            if ended:
+                print(f"  ended unfinished: {ended}")
+            for column, counts in summary['finish_order'].items():
+                print(f"  {column}: {dict(sorted(counts.items()))}")
+            normality = summary['normality']
+            if 'shapiro_p' in normality:
+                print(f"  Shapiro-Wilk p={normality['shapiro_p']:.4f}, Jarque-Bera p={normality['jarque_bera_p']:.4f}")
+        for name, label in (('welch', 'Welch'), ('paired', 'Paired')):
+            test = report[name]
+            if test is not None:
+                print(f"{label} t={test['t']:.3f} df={test['df']:.1f} p={test['p']:.4g}; "
+                      f"{self.treatment} - {self.baseline} = {test['difference']:.2f} "
+                      f"[{test['ci_low']:.2f}, {test['ci_high']:.2f}] at {confidence:.0%}")
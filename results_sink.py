@@ -0,0 +1,103 @@
+import importlib.util
+import os
+
+import pandas as pd
+
+# One schema for both policies so every results file has the same columns in the same order;
+# columns a policy does not produce (e.g. knowledge for the selfish robots) are left empty
+SCHEMA = {
+    'Strategia': 'string',
+    'Proba': 'Int64',
+    'Ziarno': 'Int64',
+    'Czas symulacji': 'float64',
+    'Poziom baterii A': 'float64',
+    'Poziom baterii B': 'float64',
+    'Poziom baterii C': 'float64',
+    'Czas robota A': 'float64',
+    'Czas robota B': 'float64',
+    'Czas robota C': 'float64',
+    'Pierwszy robot': 'string',
+    'Drugi robot': 'string',
+    'Trzeci robot': 'string',
+    'Wiedza A': 'Int64',
+    'Wiedza B': 'Int64',
+    'Wiedza C': 'Int64',
+    'Zachowania empatyczne': 'Int64',
+    'Pominięte stany A': 'Int64',
+    'Pominięte stany B': 'Int64',
+    'Pominięte stany C': 'Int64',
+    'Powód zakończenia': 'string',
+}
+
+
+def to_frame(records, schema=SCHEMA):
+    # Records are dicts keyed by column name; unknown keys are an error so the schema cannot drift silently
+    unknown = {key for record in records for key in record} - schema.keys()
+    if unknown:
+        raise KeyError(f"Columns missing from the results schema: {sorted(unknown)}")
+    return pd.DataFrame.from_records(records, columns=list(schema)).astype(schema)
+
+
+class ResultsSink:
+    # Buffers result records and writes them in batches from a single process.
+    # A .parquet path gets a new file with one row group per batch (needs pyarrow); anything else is appended as CSV.
+    # schema defaults to the shared trial schema; tools that add columns (e.g. sweeps) pass their own
+    def __init__(self, path, batch_size=100, schema=SCHEMA):
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = schema
+        self.buffer = []
+        self.written = 0
+        self.parquet = os.path.splitext(path)[1].lower() == '.parquet'
+        self._writer = None
+        if self.parquet and importlib.util.find_spec('pyarrow') is None:
+            raise ImportError("Writing .parquet results requires pyarrow; use a .csv path instead")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        df = to_frame(self.buffer, self.schema)
+        if self.parquet:
+            self._write_parquet(df)
+        else:
+            header = not os.path.isfile(self.path) or os.path.getsize(self.path) == 0
+            df.to_csv(self.path, mode='a', header=header, index=False)
+        self.written += len(self.buffer)
+        self.buffer = []
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def read_results(path, schema=SCHEMA):
+    # Loads a results file written by ResultsSink back with the schema's column types
+    if os.path.splitext(path)[1].lower() == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path).astype(schema)
@@ -0,0 +1,107 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmark import knowledge_states
+from engine import Engine, SimulationConfig
+from policies import EmpatheticPolicy
+
+
+def reference_rewards(knowledge_base, states):
+    # Expected rewards straight from the definition in float64, free of the rounding of the matrix product
+    weighted_rewards = knowledge_base.weights.astype(float) * knowledge_base.rewards
+    total_weight = knowledge_base.weights.astype(float).sum()
+    return np.array([knowledge_base.similarities(state) @ weighted_rewards / total_weight for state in states])
+
+
+class DriftProbe(EmpatheticPolicy):
+    # The empathetic policy, which at every follow/ignore decision also makes it once with exact and once with
+    # approximate rewards of the tick's states, both from the same knowledge base, and counts the differences
+    def setup(self, engine):
+        super().setup(engine)
+        self.rewards_tick = None
+        self.stats = {'decisions': 0, 'changed': 0, 'comparisons': 0, 'flipped': 0, 'evaluations': 0,
+                      'max_error': 0.0, 'max_bound': 0.0, 'over_bound': 0, 'exact_s': 0.0, 'approximate_s': 0.0}
+
+    def tick_rewards(self):
+        # The states and knowledge base only change while sensing, so both rewards are worked out once per tick
+        if self.rewards_tick != self.engine.clock.ticks:
+            states, stats, knowledge_base = self.perception.states, self.stats, self.knowledge_base
+            start = time.perf_counter()
+            knowledge_base.exact_rewards(states)
+            middle = time.perf_counter()
+            self.approximate, bounds = knowledge_base.approximate_rewards(states)
+            stats['exact_s'] += middle - start
+            stats['approximate_s'] += time.perf_counter() - middle
+            self.exact = reference_rewards(knowledge_base, states)
+            stats['evaluations'] += 1
+            error = np.abs(self.approximate - self.exact)
+            stats['max_error'] = max(stats['max_error'], float(error.max()))
+            stats['max_bound'] = max(stats['max_bound'], float(bounds.max()))
+            # A little slack for float rounding
+            stats['over_bound'] += int((error > bounds + 1e-6).sum())
+            self.rewards_tick = self.engine.clock.ticks
+        return self.exact, self.approximate
+
+    def choose_heading(self, robot):
+        if self.engine.target_in_view[robot.index] < 0:
+            exact, approximate = self.tick_rewards()
+            robots, stats, i = self.engine.robots, self.stats, robot.index
+            stats['decisions'] += 1
+            stats['changed'] += robot.find_robot_to_follow(robots, exact) is not \
+                robot.find_robot_to_follow(robots, approximate)
+            # Every reward comparison a visible robot could take part in once it has seen the target
+            visible = self.perception.visibility().visible_from(i)
+            stats['comparisons'] += len(visible)
+            stats['flipped'] += int(((exact[i] < exact[visible]) != (approximate[i] < approximate[visible])).sum())
+        return super().choose_heading(robot)
+
+
+def measure(tolerance, knowledge, robots, seeds, ticks, cluster_size):
+    # Decision drift of the approximate rewards over runs of every seed, with the knowledge base seeded by
+    # knowledge random states on top of the thesis ones
+    states, rewards = knowledge_states(knowledge)
+    config = SimulationConfig(robot_count=robots, knowledge=states.tolist(), rewards=rewards.tolist(),
+                              reward_tolerance=tolerance, reward_cluster_size=cluster_size)
+    total = {}
+    for seed in seeds:
+        policy = DriftProbe()
+        Engine(policy, config, seed).run(max_ticks=ticks)
+        for name, value in policy.stats.items():
+            total[name] = max(total.get(name, 0), value) if name.startswith('max') else total.get(name, 0) + value
+    return {'tolerance': tolerance, 'knowledge': knowledge, 'robots': robots, 'runs': len(seeds)} | total | {
+        'changed_share': total['changed'] / max(total['decisions'], 1),
+        'flipped_share': total['flipped'] / max(total['comparisons'], 1),
+        'speedup': total['exact_s'] / max(total['approximate_s'], 1e-12),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how approximate rewards change the follow/ignore decisions "
+                                                 "of the empathetic robots against exact ones.")
+    parser.add_argument('--tolerance', nargs='+', type=float, default=[0.05, 0.01])
+    parser.add_argument('--knowledge', type=int, default=100000, help="stored states the knowledge base starts with")
+    parser.add_argument('--robots', type=int, default=SimulationConfig.robot_count)
+    parser.add_argument('--runs', type=int, default=3, help="runs per tolerance, with seeds 0, 1, ...")
+    parser.add_argument('--ticks', type=int, default=600, help="ticks per run at most")
+    parser.add_argument('--cluster-size', type=float, default=SimulationConfig.reward_cluster_size)
+    parser.add_argument('--output', default=None, help="JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    for tolerance in args.tolerance:
+        result = measure(tolerance, args.knowledge, args.robots, range(args.runs), args.ticks, args.cluster_size)
+        results.append(result)
+        print(f"tolerance {tolerance:g}: {result['changed']}/{result['decisions']} decisions changed, "
+              f"{result['flipped']}/{result['comparisons']} reward comparisons flipped, "
+              f"max error {result['max_error']:.2e} (bound {result['max_bound']:.2e}, {result['over_bound']} over it), "
+              f"{result['speedup']:.1f}x faster than exact")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
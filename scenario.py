@@ -0,0 +1,94 @@
+import argparse
+import dataclasses
+import json
+
+from engine import SimulationConfig
+
+CONFIG_FIELDS = {field.name for field in dataclasses.fields(SimulationConfig)}
+
+
+def _rect(value, name):
+    rect = tuple(float(v) for v in value)
+    if len(rect) != 4 or rect[2] <= 0 or rect[3] <= 0:
+        raise ValueError(f"{name} must be [x, y, width, height] with a positive size, got {value}")
+    return rect
+
+
+def config_params(params):
+    # SimulationConfig keyword arguments from scenario values: 'targets' and 'safe_zones' are lists of
+    # [x, y, w, h], 'spawns' lists [x, y, identifier] start positions and 'spawn_regions' lists
+    # {"rect": [x, y, w, h], "weight": w} areas the other robots start in; other keys pass through
+    unknown = params.keys() - CONFIG_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown scenario keys: {sorted(unknown)}; expected fields of SimulationConfig")
+    params = dict(params)
+    if 'targets' in params:
+        params['targets'] = tuple(_rect(target, 'a target') for target in params['targets'])
+        if not params['targets']:
+            raise ValueError("A scenario needs at least one target")
+    if 'safe_zones' in params:
+        params['safe_zones'] = tuple(_rect(zone, 'a safe zone') for zone in params['safe_zones'])
+        if not params['safe_zones']:
+            raise ValueError("A scenario needs at least one safe zone")
+    if 'spawns' in params:
+        params['spawns'] = tuple((float(x), float(y), str(identifier)) for x, y, identifier in params['spawns'])
+    if 'spawn_regions' in params:
+        params['spawn_regions'] = tuple(_rect(region['rect'], 'a spawn region') + (float(region.get('weight', 1)),)
+                                        for region in params['spawn_regions'])
+    return params
+
+
+def scenario_config(scenario, **overrides):
+    # SimulationConfig of a scenario dict (see config_params) with an optional 'description'; overrides win
+    params = {key: value for key, value in scenario.items() if key != 'description'} | overrides
+    return SimulationConfig(**config_params(params))
+
+
+def load_scenario(path, **overrides):
+    with open(path) as f:
+        return scenario_config(json.load(f), **overrides)
+
+
+def describe(config):
+    print(f"{config.width}x{config.height} arena, {len(config.target_rects())} targets, "
+          f"{len(config.safe_areas())} safe zones, {config.robot_count} robots "
+          f"({min(len(config.spawns), config.robot_count)} at fixed spawns)")
+    for x, y, w, h, weight in config.spawn_areas():
+        print(f"  spawn region ({x:g}, {y:g}, {w:g}, {h:g}) weight {weight:g}")
+
+
+def show(config):
+    # Draws the arena with the spawn regions outlined and the fixed spawns marked, until the window is closed
+    import pygame
+
+    from engine import GREEN, RED, WHITE
+
+    pygame.init()
+    screen = pygame.display.set_mode((config.width, config.height))
+    pygame.display.set_caption("Scenario")
+    screen.fill(WHITE)
+    for rect in config.target_rects() + config.safe_areas():
+        pygame.draw.rect(screen, GREEN, rect)
+    for x, y, w, h, _ in config.spawn_areas():
+        pygame.draw.rect(screen, (0, 0, 0), (x, y, w, h), 1)
+    for x, y, _ in config.spawns[:config.robot_count]:
+        pygame.draw.circle(screen, RED, (int(x), int(y)), config.robot_size / 2)
+    pygame.display.flip()
+    while pygame.event.wait().type != pygame.QUIT:
+        pass
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a scenario file and optionally draw its arena.")
+    parser.add_argument('path')
+    parser.add_argument('--show', action='store_true', help="draw the arena, zones and spawn regions in a window")
+    args = parser.parse_args()
+    config = load_scenario(args.path)
+    describe(config)
+    if args.show:
+        show(config)
+
+
+if __name__ == "__main__":
+    main()
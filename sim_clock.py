@@ -0,0 +1,22 @@
+import numpy as np
+
+
+class SimClock:
+    # Simulated time driven by the tick count, independent of machine load and frame rate
+    def __init__(self, dt=1 / 60):
+        self.dt = dt
+        self.ticks = 0
+
+    @property
+    def now(self):
+        return self.ticks * self.dt
+
+    def tick(self):
+        self.ticks += 1
+
+    def elapsed(self, since):
+        return self.now - since
+
+    def is_due(self, since, interval):
+        # Compare in whole ticks so ticks * dt rounding never delays an event by a tick
+        return np.round(self.elapsed(since) / self.dt) >= round(interval / self.dt)
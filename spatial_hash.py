@@ -0,0 +1,100 @@
+import math
+
+import numpy as np
+
+# Half of the 3x3 neighbourhood, so every unordered pair of cells is visited exactly once
+_NEIGHBOUR_OFFSETS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+
+def _expand_ranges(starts, counts):
+    # Concatenation of range(start, start + count) for every pair, without a Python loop
+    total = counts.sum()
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total) - offsets + np.repeat(starts, counts)
+
+
+class SpatialHash:
+    # Uniform grid rebuilt every tick; robots closer than cell_size always land in the same or adjacent cells
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+
+    def candidate_pairs(self, x, y):
+        # Index pairs (i < j) of robots in the same or adjacent cells
+        n = len(x)
+        if n < 2:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        cell_x = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+        cell_y = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+        cell_x -= cell_x.min()
+        cell_y -= cell_y.min()
+        stride = cell_y.max() + 3
+        keys = (cell_x + 1) * stride + cell_y + 1
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        positions = np.arange(n)
+
+        first, second = [], []
+        for dx, dy in _NEIGHBOUR_OFFSETS:
+            neighbour_keys = keys[order] + dx * stride + dy
+            starts = np.searchsorted(sorted_keys, neighbour_keys, side='left')
+            ends = np.searchsorted(sorted_keys, neighbour_keys, side='right')
+            if dx == 0 and dy == 0:
+                # Same cell: only take robots after this one in the sorted order
+                starts = np.maximum(starts, positions + 1)
+            counts = np.maximum(ends - starts, 0)
+            first.append(np.repeat(order, counts))
+            second.append(order[_expand_ranges(starts, counts)])
+
+        i = np.concatenate(first)
+        j = np.concatenate(second)
+        return np.minimum(i, j), np.maximum(i, j)
+
+
+# Cell coordinates are shifted by _CELL_OFFSET and packed into one int64 key per cell
+_CELL_OFFSET = 1 << 20
+_CELL_SPAN = 1 << 21
+
+
+def _cell_keys(cell_x, cell_y):
+    return (cell_x + _CELL_OFFSET) * _CELL_SPAN + cell_y + _CELL_OFFSET
+
+
+class RectIndex:
+    # Static uniform grid over rectangles (x, y, w, h). Each rectangle is listed under every cell it overlaps,
+    # so the rectangles within reach of a point are among those listed in the cells around the point's cell
+    def __init__(self, rects, cell_size):
+        self.cell_size = float(cell_size)
+        self.rects = rects = np.asarray(rects, dtype=float).reshape(-1, 4)
+        x0 = np.floor(rects[:, 0] / self.cell_size).astype(np.int64)
+        y0 = np.floor(rects[:, 1] / self.cell_size).astype(np.int64)
+        wide = np.floor((rects[:, 0] + rects[:, 2]) / self.cell_size).astype(np.int64) - x0 + 1
+        tall = np.floor((rects[:, 1] + rects[:, 3]) / self.cell_size).astype(np.int64) - y0 + 1
+        counts = wide * tall
+        ids = np.repeat(np.arange(len(rects)), counts)
+        within = _expand_ranges(np.zeros(len(rects), dtype=np.int64), counts)
+        keys = _cell_keys(x0[ids] + within // tall[ids], y0[ids] + within % tall[ids])
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.ids = ids[order]
+
+    def __len__(self):
+        return len(self.rects)
+
+    def query(self, x, y, reach):
+        # (point, rectangle) index pairs, sorted and without repeats, covering every rectangle that comes
+        # within reach of a point (plus some that do not)
+        x, y = np.ravel(x), np.ravel(y)
+        n, m = len(x), max(len(self.rects), 1)
+        cells = max(1, math.ceil(reach / self.cell_size))
+        offsets = np.arange(-cells, cells + 1)
+        cell_x = np.floor(x / self.cell_size).astype(np.int64)[:, None, None] + offsets[:, None]
+        cell_y = np.floor(y / self.cell_size).astype(np.int64)[:, None, None] + offsets
+        keys = _cell_keys(cell_x, cell_y).ravel()
+        starts = np.searchsorted(self.keys, keys, side='left')
+        counts = np.searchsorted(self.keys, keys, side='right') - starts
+        points = np.repeat(np.arange(n), len(offsets) ** 2)
+        pairs = np.repeat(points, counts) * m + self.ids[_expand_ranges(starts, counts)]
+        # A rectangle spanning several of the cells around a point is found once per cell
+        pairs = np.unique(pairs)
+        return pairs // m, pairs % m
@@ -0,0 +1,189 @@
+import argparse
+import dataclasses
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from engine import SimulationConfig
+from policies import POLICIES
+from results_sink import SCHEMA, ResultsSink
+from scenario import config_params, load_scenario
+from trial_runner import run_pool, run_trial, trial_seeds
+
+# Result columns of a sweep on top of the trial schema: the configuration hash, then one column per swept
+# parameter, left empty in the rows of a policy that ignores it
+KEY_COLUMN = 'Konfiguracja'
+CONFIG_FIELDS = {field.name: field for field in dataclasses.fields(SimulationConfig)}
+
+
+def config_hash(config, ignored=()):
+    # Stable key of everything a run depends on apart from the policy and the seed, so a changed default
+    # is a new configuration rather than a silent cache hit; ignored are fields the policy never reads
+    params = {name: value for name, value in dataclasses.asdict(config).items() if name not in ignored}
+    text = json.dumps(params, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def make_config(params, base=None):
+    # base is the configuration the parameters are applied on, e.g. a loaded scenario; zones and spawns
+    # are given as in scenario files
+    unknown = params.keys() - CONFIG_FIELDS.keys()
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}; expected fields of SimulationConfig")
+    return dataclasses.replace(base if base is not None else SimulationConfig(), **config_params(params))
+
+
+def grid_points(grid):
+    # Every combination of the listed values, e.g. {"similarity_threshold": [0.9, 0.96], "robot_count": [3, 10]}
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_points(spec, seed=None):
+    # spec['samples'] points drawn from spec['parameters'], where each parameter is either {"choices": [...]}
+    # or a {"low": a, "high": b} range (integers when both ends are). The draws only depend on the seed, so
+    # rerunning the same spec regenerates the same points and a resumed sweep finds its finished ones
+    rng = np.random.default_rng(seed)
+    points = []
+    for _ in range(spec['samples']):
+        point = {}
+        for name in sorted(spec['parameters']):
+            space = spec['parameters'][name]
+            if 'choices' in space:
+                point[name] = space['choices'][rng.integers(len(space['choices']))]
+            elif isinstance(space['low'], int) and isinstance(space['high'], int):
+                point[name] = int(rng.integers(space['low'], space['high'], endpoint=True))
+            else:
+                point[name] = float(rng.uniform(space['low'], space['high']))
+        points.append(point)
+    return points
+
+
+def load_spec(path):
+    with open(path) as f:
+        spec = json.load(f)
+    if ('grid' in spec) == ('random' in spec):
+        raise ValueError("A sweep spec needs exactly one of 'grid' and 'random'")
+    return spec
+
+
+def sweep_seed(spec, output):
+    # The spec's base seed, or else one drawn on the first run and kept in <output>.seed, so a resumed sweep
+    # regenerates the same random points and gives its remaining trials the same seeds as the finished ones
+    if spec.get('seed') is not None:
+        return spec['seed']
+    path = output + '.seed'
+    if os.path.isfile(path):
+        with open(path) as f:
+            return int(f.read())
+    if os.path.isfile(output) and os.path.getsize(output) > 0:
+        raise ValueError(f"{output} has results but no {path}; set the sweep's 'seed' in the spec to resume it")
+    seed = int(np.random.SeedSequence().entropy)
+    with open(path, 'w') as f:
+        f.write(f'{seed}\n')
+    return seed
+
+
+def sweep_points(spec, seed):
+    # (key, params, config) of every distinct configuration in the spec, in order
+    points = grid_points(spec['grid']) if 'grid' in spec else random_points(spec['random'], seed)
+    base = load_scenario(spec['scenario']) if 'scenario' in spec else None
+    seen = set()
+    configs = []
+    for params in points:
+        config = make_config(params, base)
+        key = config_hash(config)
+        if key not in seen:
+            seen.add(key)
+            configs.append((key, params, config))
+    return configs
+
+
+def sweep_schema(names):
+    schema = {KEY_COLUMN: 'string'}
+    for name in sorted(names):
+        field_type = CONFIG_FIELDS[name].type
+        schema[name] = 'Int64' if field_type in (int, 'int') else 'float64' if field_type in (float, 'float') else 'string'
+    return schema | SCHEMA
+
+
+def finished_trials(path, schema):
+    # (configuration, policy, trial) of every row already in the results file. A row cut short by a killed
+    # run is dropped from the file so appending resumes on a clean line
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    if list(pd.read_csv(path, nrows=0).columns) != list(schema):
+        raise ValueError(f"{path} was written by a sweep over other parameters; use a new output file")
+    done = pd.read_csv(path, usecols=[KEY_COLUMN, 'Strategia', 'Proba'], dtype=str)
+    return set(zip(done[KEY_COLUMN], done['Strategia'], done['Proba'].astype(int)))
+
+
+def run_sweep_trial(key, columns, policy, trial, seed, config):
+    return {KEY_COLUMN: key, **columns, **run_trial(policy, trial, seed, config)}
+
+
+def sweep_jobs(configs, policies, trials, base_seed):
+    # Every configuration gets the same trial seeds, so differences between configurations are not seed noise.
+    # A policy runs once per distinct set of the fields it reads: configurations that only differ in fields it
+    # ignores (e.g. the knowledge settings for the selfish robots) share its trials
+    seeds = trial_seeds(trials, base_seed)
+    seen = set()
+    for _, params, config in configs:
+        for policy in policies:
+            ignored = POLICIES[policy].ignored_fields
+            key = config_hash(config, ignored)
+            if (key, policy) in seen:
+                continue
+            seen.add((key, policy))
+            columns = {name: None if name in ignored else json.dumps(value) if isinstance(value, (list, tuple))
+                       else value for name, value in params.items()}
+            for trial, seed in enumerate(seeds, start=1):
+                yield key, columns, policy, trial, seed, config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep SimulationConfig parameters over a grid or random search.")
+    parser.add_argument('spec', help="JSON sweep spec with 'grid' or 'random', and optionally 'scenario', 'policies', "
+                                     "'trials', 'seed'")
+    parser.add_argument('--output', default='sweep.csv', help="CSV results file; rerunning with it resumes the sweep")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=20, help="records buffered before each write")
+    parser.add_argument('--dry-run', action='store_true', help="only print what is left to run")
+    args = parser.parse_args()
+
+    if os.path.splitext(args.output)[1].lower() != '.csv':
+        parser.error("sweeps resume by appending, so --output must be a .csv file")
+    spec = load_spec(args.spec)
+    policies = spec.get('policies', sorted(POLICIES))
+    trials = spec.get('trials', 10)
+    seed = sweep_seed(spec, args.output)
+    configs = sweep_points(spec, seed)
+    schema = sweep_schema({name for _, params, _ in configs for name in params})
+    done = finished_trials(args.output, schema)
+
+    jobs = list(sweep_jobs(configs, policies, trials, seed))
+    total = len(jobs)
+    jobs = [job for job in jobs if (job[0], job[2], job[3]) not in done]
+    print(f"{len(configs)} configurations, {total} trials, {total - len(jobs)} already in {args.output} (seed {seed})")
+    if args.dry_run or not jobs:
+        return
+
+    completed = 0
+    with ResultsSink(args.output, args.batch_size, schema) as sink:
+        for record in run_pool(run_sweep_trial, jobs, args.workers):
+            completed += 1
+            sink.write(record)
+            print(f"[{completed}/{len(jobs)}] {record[KEY_COLUMN]} {record['Strategia']} trial {record['Proba']}: "
+                  f"{record['Czas symulacji']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import pytest
+
+from batch_worlds import compare
+
+
+@pytest.mark.parametrize('policy', ['selfish', 'empathetic'])
+def test_batch_rows_match_engine_rows(policy):
+    assert compare(policy, [0, 1, 2, 3]) == []
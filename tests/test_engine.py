@@ -0,0 +1,15 @@
+import pytest
+
+from batch_worlds import run_batch
+from engine import SimulationConfig, run_simulation
+from policies import POLICIES
+
+
+@pytest.mark.parametrize('policy', sorted(POLICIES))
+def test_a_single_robot_run_ends_with_a_result_row(policy):
+    config = SimulationConfig(robot_count=1)
+    row = run_simulation(POLICIES[policy](), config, 0)
+    assert row['Pierwszy robot'] == 'A'
+    assert row['Drugi robot'] is None and row['Trzeci robot'] is None
+    assert row['Poziom baterii B'] is None
+    assert run_batch(policy, [0], config)[0] == row
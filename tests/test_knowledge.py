@@ -0,0 +1,30 @@
+import numpy as np
+
+from benchmark import knowledge_states
+from knowledge import KNOWLEDGE, REWARDS, KnowledgeBase
+
+
+def test_least_used_keeps_a_new_state_through_the_next_compaction():
+    rng = np.random.default_rng(0)
+    kb = KnowledgeBase(KNOWLEDGE, REWARDS, capacity=len(KNOWLEDGE) + 20, policy='least_used', dtype=np.float64)
+    for state in rng.random((20, 6)):
+        kb.append(state, 0.5)
+    # Older rows build up use counts before the store is full
+    kb.rewards_for(rng.random((200, 6)))
+
+    new = np.full(6, 0.123)
+    kb.append(new, 0.9)
+    assert (kb.states == new).all(axis=1).any()
+    kb.append(np.full(6, 0.456), 0.1)
+    assert (kb.states == new).all(axis=1).any()
+
+
+def test_approximate_rewards_stay_within_their_error_bound():
+    states, rewards = knowledge_states(20000)
+    kb = KnowledgeBase(states, rewards, tolerance=0.05, dtype=np.float64)
+    queries = np.random.default_rng(1).random((200, 6))
+    approximate, bounds = kb.approximate_rewards(queries)
+    # Some groups must have been taken at their centroids, or nothing was approximated
+    assert (bounds > 0).any()
+    assert (bounds <= kb.tolerance).all()
+    assert (np.abs(approximate - kb.exact_rewards(queries)) <= bounds + 1e-9).all()
@@ -0,0 +1,20 @@
+import math
+
+import numpy as np
+
+from perception import Visibility
+from spatial_hash import SpatialHash
+
+
+def test_grid_visibility_matches_all_pairs():
+    rng = np.random.default_rng(0)
+    n, view_distance, view_angle = 200, 60.0, math.pi / 3
+    x, y = rng.uniform(0, 400, n), rng.uniform(0, 300, n)
+    angle = rng.uniform(0, 2 * math.pi, n)
+    grid = Visibility(x, y, angle, view_distance, view_angle, SpatialHash(view_distance))
+    every = Visibility(x, y, angle, view_distance, view_angle)
+    assert len(every.src) > 0
+    np.testing.assert_array_equal(grid.src, every.src)
+    np.testing.assert_array_equal(grid.dst, every.dst)
+    np.testing.assert_array_equal(grid.indptr, every.indptr)
+    np.testing.assert_allclose(grid.distance, every.distance)
@@ -0,0 +1,33 @@
+import numpy as np
+from scipy import stats
+
+from result_stats import Comparison
+
+
+def comparison(baseline, treatment):
+    result = Comparison()
+    for trial, (a, b) in enumerate(zip(baseline, treatment), start=1):
+        result.add({'Strategia': 'selfish', 'Proba': trial, 'Czas symulacji': a, 'Powód zakończenia': 'ukończono'})
+        result.add({'Strategia': 'empathetic', 'Proba': trial, 'Czas symulacji': b, 'Powód zakończenia': 'ukończono'})
+    return result
+
+
+def test_welch_and_paired_match_scipy():
+    rng = np.random.default_rng(0)
+    baseline = rng.normal(20, 4, 40)
+    treatment = baseline + rng.normal(-1, 2, 40)
+    result = comparison(baseline, treatment)
+
+    welch = result.welch()
+    expected = stats.ttest_ind(treatment, baseline, equal_var=False)
+    assert np.isclose(welch['t'], expected.statistic)
+    assert np.isclose(welch['p'], expected.pvalue)
+    assert np.isclose(welch['difference'], treatment.mean() - baseline.mean())
+
+    paired = result.paired()
+    expected = stats.ttest_rel(treatment, baseline)
+    assert paired['pairs'] == 40
+    assert np.isclose(paired['t'], expected.statistic)
+    assert np.isclose(paired['p'], expected.pvalue)
+    low, high = expected.confidence_interval(0.95)
+    assert np.isclose(paired['ci_low'], low) and np.isclose(paired['ci_high'], high)
@@ -0,0 +1,24 @@
+from results_sink import SCHEMA, ResultsSink, read_results
+
+
+def test_csv_round_trip_keeps_the_schema(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    records = [
+        {'Strategia': 'selfish', 'Proba': 1, 'Ziarno': 7, 'Czas symulacji': 12.5, 'Poziom baterii A': 98.0,
+         'Pierwszy robot': 'B', 'Powód zakończenia': 'ukończono'},
+        {'Strategia': 'empathetic', 'Proba': 1, 'Ziarno': 7, 'Czas symulacji': 11.25, 'Wiedza A': 40,
+         'Zachowania empatyczne': 3, 'Powód zakończenia': 'limit czasu'},
+        {'Strategia': 'empathetic', 'Proba': 2, 'Ziarno': 8, 'Czas symulacji': 9.0},
+    ]
+    # Two batches, so the second append must not repeat the header
+    with ResultsSink(path, batch_size=2) as sink:
+        sink.write_many(records)
+    assert sink.written == 3
+
+    df = read_results(path)
+    assert list(df.columns) == list(SCHEMA)
+    assert {column: str(dtype) for column, dtype in df.dtypes.items()} == SCHEMA
+    assert df['Strategia'].tolist() == ['selfish', 'empathetic', 'empathetic']
+    assert df['Wiedza A'].isna().tolist() == [True, False, True] and df['Wiedza A'][1] == 40
+    assert df['Czas symulacji'].tolist() == [12.5, 11.25, 9.0]
+    assert df['Pierwszy robot'].isna().tolist() == [False, True, True]
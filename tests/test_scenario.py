@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from batch_worlds import run_batch
+from engine import run_simulation
+from policies import POLICIES
+from scenario import load_scenario
+
+
+def small_arena(tmp_path, robots):
+    path = tmp_path / 'small.json'
+    path.write_text(json.dumps({
+        'width': 300,
+        'height': 300,
+        'targets': [[0, 0, 100, 100]],
+        'safe_zones': [[35, 35, 30, 30]],
+        'spawns': [[250, 250, 'A'], [200, 250, 'B']][:robots],
+        'robot_count': robots,
+    }))
+    return load_scenario(str(path))
+
+
+@pytest.mark.parametrize('robots', [1, 2])
+@pytest.mark.parametrize('policy', sorted(POLICIES))
+def test_arenas_with_fewer_than_three_robots_leave_the_missing_places_empty(tmp_path, policy, robots):
+    config = small_arena(tmp_path, robots)
+    row = run_simulation(POLICIES[policy](), config, 0)
+    missing = 'ABC'[robots:]
+    places = [row['Pierwszy robot'], row['Drugi robot'], row['Trzeci robot']]
+    assert sorted(filter(None, places)) == sorted('AB'[:robots])
+    assert places[robots:] == [None] * (3 - robots)
+    for identifier in missing:
+        assert row[f'Poziom baterii {identifier}'] is None
+        assert row[f'Czas robota {identifier}'] is None
+    assert run_batch(policy, [0], config)[0] == row
@@ -0,0 +1,17 @@
+import numpy as np
+
+from spatial_hash import SpatialHash
+
+
+def test_candidate_pairs_cover_every_pair_within_the_cell_size():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-50, 400, 300), rng.uniform(0, 300, 300)
+    cell_size = 25.0
+    first, second = SpatialHash(cell_size).candidate_pairs(x, y)
+    assert (first < second).all()
+    candidates = set(zip(first.tolist(), second.tolist()))
+    assert len(candidates) == len(first)
+
+    i, j = np.triu_indices(len(x), k=1)
+    close = np.hypot(x[i] - x[j], y[i] - y[j]) <= cell_size
+    assert set(zip(i[close].tolist(), j[close].tolist())) <= candidates
@@ -0,0 +1,15 @@
+from sweep import config_hash, sweep_jobs, sweep_points
+
+
+def test_selfish_trials_are_shared_by_configurations_that_only_differ_in_knowledge_settings():
+    spec = {'grid': {'similarity_threshold': [0.9, 0.96], 'robot_count': [2, 3]}}
+    configs = sweep_points(spec, 0)
+    jobs = list(sweep_jobs(configs, ['empathetic', 'selfish'], 2, 0))
+    selfish = [job for job in jobs if job[2] == 'selfish']
+    empathetic = [job for job in jobs if job[2] == 'empathetic']
+    assert len(empathetic) == 4 * 2
+    assert len(selfish) == 2 * 2
+    assert {job[1]['robot_count'] for job in selfish} == {2, 3}
+    assert all(job[1]['similarity_threshold'] is None for job in selfish)
+    # The empathetic key is the hash of the whole configuration
+    assert {job[0] for job in empathetic} == {config_hash(config) for _, _, config in configs}
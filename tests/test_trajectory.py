@@ -0,0 +1,20 @@
+import sys
+
+import pytest
+
+import trajectory
+from trajectory import Trajectory, TrajectoryRecorder
+
+
+def test_an_empty_recording_is_reported_instead_of_failing(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'empty.traj')
+    TrajectoryRecorder(path, 3, {'policy': 'selfish', 'seed': 0}).close()
+    trajectory.summarize(Trajectory(path))
+    assert capsys.readouterr().out == "0 ticks of 3 robots (selfish, seed 0)\n"
+
+    for args in ([], ['--tick', '-1']):
+        monkeypatch.setattr(sys, 'argv', ['trajectory.py', path, *args])
+        with pytest.raises(SystemExit) as exit_info:
+            trajectory.main()
+        assert exit_info.value.code == 1
+        assert 'no recorded ticks' in capsys.readouterr().err
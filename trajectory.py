@@ -0,0 +1,212 @@
+import argparse
+import json
+import struct
+
+import numpy as np
+
+from world import Mode
+
+# Per robot and tick: position, heading, battery, the reward the robot currently expects (NaN for policies
+# without one) and its world.Mode
+RECORD = np.dtype([
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('angle', '<f4'),
+    ('battery', '<f4'),
+    ('reward', '<f4'),
+    ('mode', 'u1'),
+])
+MAGIC = b'RTRAJ002'
+# Magic, ticks written, robots and the length of the JSON metadata that follows
+HEADER = struct.Struct('<8sQII')
+ALIGN = 64
+
+
+def _data_offset(meta_bytes):
+    return -(-(HEADER.size + len(meta_bytes)) // ALIGN) * ALIGN
+
+
+def frame_colors(meta, modes):
+    # Colours the robots were drawn in: their base colour while searching, otherwise their mode's colour
+    base = [tuple(color) for color in meta['base_colors']]
+    mode_colors = {int(mode): tuple(color) for mode, color in meta['mode_colors'].items()}
+    return [mode_colors.get(mode, base[i]) for i, mode in enumerate(np.asarray(modes).tolist())]
+
+
+class TrajectoryRecorder:
+    # Appends one fixed-width row per robot and tick to a preallocated memory-mapped file, doubling it when
+    # full. The tick count in the header is only updated every flush_every ticks and on close, so a killed
+    # run loses at most that many ticks and the file stays readable
+    def __init__(self, path, robots, meta=None, capacity=4096, flush_every=256):
+        self.path = path
+        self.robots = robots
+        self.flush_every = flush_every
+        self.ticks = 0
+        meta_bytes = json.dumps(meta or {}).encode()
+        self.offset = _data_offset(meta_bytes)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, 0, robots, len(meta_bytes)) + meta_bytes)
+        self.capacity = 0
+        self.data = None
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        if self.data is not None:
+            self.data.flush()
+            del self.data
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.offset + capacity * self.robots * RECORD.itemsize)
+        self.data = np.memmap(self.path, RECORD, 'r+', self.offset, (capacity, self.robots))
+        self.capacity = capacity
+
+    def record(self, x, y, angle, battery, mode, reward=None):
+        if self.ticks == self.capacity:
+            self._grow(2 * self.capacity)
+        row = self.data[self.ticks]
+        row['x'], row['y'], row['angle'], row['battery'], row['mode'] = x, y, angle, battery, mode
+        row['reward'] = np.nan if reward is None else reward
+        self.ticks += 1
+        if self.ticks % self.flush_every == 0:
+            self._write_ticks()
+
+    def _write_ticks(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(8)
+            f.write(struct.pack('<Q', self.ticks))
+
+    def close(self):
+        if self.data is None:
+            return
+        self.data.flush()
+        del self.data
+        self.data = None
+        # Drop the unused preallocated tail
+        with open(self.path, 'r+b') as f:
+            f.truncate(self.offset + self.ticks * self.robots * RECORD.itemsize)
+        self._write_ticks()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory:
+    # Read-only view of a recorded run; any tick is one memory-mapped row away, so seeking costs nothing
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, ticks, robots, meta_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+            meta_bytes = f.read(meta_len)
+        self.meta = json.loads(meta_bytes)
+        self.robots = robots
+        self.ticks = ticks
+        self.data = np.memmap(path, RECORD, 'r', _data_offset(meta_bytes), (ticks, robots)) if ticks else \
+            np.zeros((0, robots), RECORD)
+
+    def __len__(self):
+        return self.ticks
+
+    def frame(self, tick):
+        # State of every robot after the given tick, with attribute access (frame.x, frame.mode, ...)
+        return self.data[tick].view(np.recarray)
+
+    def column(self, name):
+        # One field over the whole run, shape (ticks, robots)
+        return self.data[name]
+
+    def colors(self, tick):
+        return frame_colors(self.meta, self.data[tick]['mode'])
+
+    def time(self, tick):
+        # Simulated time of a tick, on the same clock as the result row's times
+        return tick * self.meta.get('dt', 1 / 60)
+
+
+def summarize(trajectory):
+    meta = trajectory.meta
+    if not trajectory.ticks:
+        print(f"0 ticks of {trajectory.robots} robots ({meta.get('policy')}, seed {meta.get('seed')})")
+        return
+    print(f"{trajectory.ticks} ticks of {trajectory.robots} robots "
+          f"({meta.get('policy')}, seed {meta.get('seed')}, {trajectory.time(trajectory.ticks - 1):.2f} s)")
+    x, y = trajectory.column('x'), trajectory.column('y')
+    path_length = np.hypot(np.diff(x, axis=0), np.diff(y, axis=0)).sum(axis=0)
+    final = trajectory.frame(-1)
+    for i, identifier in enumerate(meta.get('identifiers', range(trajectory.robots))):
+        print(f"  {identifier}: path {path_length[i]:.1f} px, final battery {final.battery[i]:.2f}, "
+              f"final reward {final.reward[i]:.3f}")
+
+
+def print_tick(trajectory, tick):
+    frame = trajectory.frame(tick)
+    print(f"Tick {tick % trajectory.ticks} ({trajectory.time(tick % trajectory.ticks):.2f} s)")
+    for i, identifier in enumerate(trajectory.meta.get('identifiers', range(trajectory.robots))):
+        print(f"  {identifier}: x={frame.x[i]:.1f} y={frame.y[i]:.1f} angle={frame.angle[i]:.3f} "
+              f"battery={frame.battery[i]:.2f} mode={Mode(frame.mode[i]).name} reward={frame.reward[i]:.3f}")
+
+
+def play(trajectory, start=0, speed=1.0):
+    # Redraws the recorded run with the simulation's renderer. Space pauses, the arrow keys seek by a second
+    # (Shift: ten) and Home/End jump to the ends
+    import pygame
+
+    from renderer import Renderer
+
+    meta = trajectory.meta
+    pygame.init()
+    screen = pygame.display.set_mode((meta['width'], meta['height']))
+    renderer = Renderer(screen, meta['view_distance'], meta['view_angle'])
+    rects = [(tuple(color), tuple(rect)) for color, rect in meta.get('arena', [])]
+    fps = 1 / meta.get('dt', 1 / 60)
+    clock = pygame.time.Clock()
+    tick, paused, running = max(0, min(start, trajectory.ticks - 1)), False, True
+    position = float(tick)
+    while running and trajectory.ticks:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                step = int(fps) * (10 if event.mod & pygame.KMOD_SHIFT else 1)
+                moves = {pygame.K_RIGHT: position + step, pygame.K_LEFT: position - step,
+                         pygame.K_HOME: 0, pygame.K_END: trajectory.ticks - 1}
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key in moves:
+                    position = float(max(0, min(moves[event.key], trajectory.ticks - 1)))
+        tick = int(position)
+        pygame.display.set_caption(f"Replay {tick}/{trajectory.ticks - 1} ({trajectory.time(tick):.2f} s)")
+        renderer.draw(trajectory.frame(tick), trajectory.colors(tick), meta['robot_size'], (255, 255, 255), rects)
+        pygame.display.flip()
+        clock.tick(60)
+        if not paused:
+            position = min(position + speed * fps / 60, trajectory.ticks - 1)
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay a recorded trajectory without re-simulating it.")
+    parser.add_argument('path')
+    parser.add_argument('--tick', type=int, default=None,
+                        help="print every robot's state at this tick (negative counts from the end)")
+    parser.add_argument('--play', action='store_true', help="replay the run in a window")
+    parser.add_argument('--start', type=int, default=0, help="tick to start the replay from")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay speed relative to simulated time")
+    args = parser.parse_args()
+
+    trajectory = Trajectory(args.path)
+    if not trajectory.ticks:
+        # A run killed before its first flush leaves a header without ticks
+        parser.exit(1, f"{args.path} holds no recorded ticks\n")
+    if args.tick is not None:
+        print_tick(trajectory, args.tick)
+    else:
+        summarize(trajectory)
+    if args.play:
+        play(trajectory, args.start, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from batch_worlds import run_batch
+from engine import SimulationConfig, run_simulation
+from policies import POLICIES
+from result_stats import Comparison, finished
+from results_sink import ResultsSink
+from scenario import load_scenario
+from watchdog import REASON_COLUMN
+
+
+def trial_seeds(trials, base_seed=None):
+    # Independent, reproducible seeds for every trial derived from one base seed
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(base_seed).spawn(trials)]
+
+
+def run_trial(policy, trial, seed, config=None, record_dir=None):
+    record = os.path.join(record_dir, f'{policy}_{trial}.traj') if record_dir else None
+    data = run_simulation(POLICIES[policy](), config, seed, record=record)
+    return {'Strategia': policy, 'Proba': trial, 'Ziarno': seed, **data}
+
+
+def run_trial_batch(policy, trials, seeds, config=None):
+    # Several trials of one policy stepped together in one BatchEngine; the rows equal run_trial's
+    rows = run_batch(policy, seeds, config)
+    return [{'Strategia': policy, 'Proba': trial, 'Ziarno': seed, **data} for trial, seed, data in zip(trials, seeds, rows)]
+
+
+def run_pool(function, jobs, workers=None):
+    # Calls function(*job) for every job across a process pool and yields each result as soon as it is ready.
+    # Only a couple of jobs per worker are queued at a time, so closing the generator (e.g. on early stopping)
+    # abandons the rest of the batch
+    jobs = iter(jobs)
+    workers = workers or os.cpu_count()
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {pool.submit(function, *job) for job in itertools.islice(jobs, 2 * workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            pending |= {pool.submit(function, *job) for job in itertools.islice(jobs, len(done))}
+            for future in done:
+                yield future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_trials(policy, trials, base_seed=None, workers=None, record_dir=None, batch_worlds=1, config=None):
+    # Runs the trials across a process pool and yields each result as soon as it is ready.
+    # policy 'both' runs every trial seed under each policy; the engine draws the same random numbers for
+    # both, so the two runs of a seed form a pair with common random numbers.
+    # With batch_worlds > 1 each job steps that many trials together (see batch_worlds.py)
+    policies = sorted(POLICIES) if policy == 'both' else [policy]
+    numbered = list(enumerate(trial_seeds(trials, base_seed), start=1))
+    if batch_worlds <= 1:
+        jobs = ((name, trial, seed, config, record_dir) for trial, seed in numbered for name in policies)
+        return run_pool(run_trial, jobs, workers)
+    batches = [numbered[start:start + batch_worlds] for start in range(0, len(numbered), batch_worlds)]
+    jobs = ((name, [trial for trial, _ in batch], [seed for _, seed in batch], config)
+            for batch in batches for name in policies)
+    return (record for rows in run_pool(run_trial_batch, jobs, workers) for record in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run independent headless trials of a robot policy in parallel.")
+    parser.add_argument('policy', choices=sorted(POLICIES) + ['both'])
+    parser.add_argument('--trials', type=int, default=10, help="trials per policy")
+    parser.add_argument('--seed', type=int, default=None, help="base seed; a random one is drawn and printed when omitted")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', default=None, help="results file (.csv is appended to, .parquet needs pyarrow)")
+    parser.add_argument('--batch-size', type=int, default=100, help="records buffered before each write")
+    parser.add_argument('--record-dir', default=None,
+                        help="write each trial's trajectory to <policy>_<trial>.traj in this directory")
+    parser.add_argument('--batch-worlds', type=int, default=1,
+                        help="trials each worker steps together in one vectorized batch (no --record-dir)")
+    parser.add_argument('--scenario', default=None, help="JSON scenario file with the arena, zones and spawns")
+    parser.add_argument('--max-time', type=float, default=SimulationConfig.max_time,
+                        help="end runs unfinished after this many simulated seconds")
+    parser.add_argument('--stall-window', type=float, default=None,
+                        help="end runs where no robot got closer to the target for this many simulated seconds")
+    parser.add_argument('--stop-alpha', type=float, default=None,
+                        help="with 'both', stop once the --test comparison of the simulation times is significant at this level")
+    parser.add_argument('--stop-ci-width', type=float, default=None,
+                        help="with 'both', stop once the 95%% confidence interval of the difference is narrower than this")
+    parser.add_argument('--min-trials', type=int, default=30, help="trials per policy before early stopping is considered")
+    parser.add_argument('--test', choices=['paired', 'welch'], default='paired',
+                        help="test used for early stopping with 'both': paired t-test over seeds (default) or Welch")
+    args = parser.parse_args()
+
+    if args.record_dir and args.batch_worlds > 1:
+        parser.error("--record-dir needs one engine per trial; drop --batch-worlds")
+    if args.record_dir:
+        os.makedirs(args.record_dir, exist_ok=True)
+    if args.seed is None:
+        args.seed = np.random.SeedSequence().entropy
+    print("Base seed:", args.seed)
+
+    total = args.trials * (len(POLICIES) if args.policy == 'both' else 1)
+    limits = {'max_time': args.max_time, 'stall_window': args.stall_window}
+    config = load_scenario(args.scenario, **limits) if args.scenario else SimulationConfig(**limits)
+    comparison = Comparison()
+    # Only this process writes, in batches, so parallel workers never race on the results file
+    sink = ResultsSink(args.output, args.batch_size) if args.output else None
+    completed = 0
+    try:
+        for record in run_trials(args.policy, args.trials, args.seed, args.workers, args.record_dir,
+                                 args.batch_worlds, config):
+            completed += 1
+            comparison.add(record)
+            if sink is not None:
+                sink.write(record)
+            ended = '' if finished(record) else f" ({record[REASON_COLUMN]})"
+            print(f"[{completed}/{total}] {record['Strategia']} trial {record['Proba']}: {record['Czas symulacji']:.2f} s{ended}")
+            if comparison.should_stop(args.stop_alpha, args.stop_ci_width, args.min_trials, paired=args.test == 'paired'):
+                print(f"Stopping early after {completed} trials")
+                break
+    finally:
+        if sink is not None:
+            sink.close()
+
+    comparison.print_report()
+
+
+if __name__ == "__main__":
+    main()
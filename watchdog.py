@@ -0,0 +1,58 @@
+from enum import IntEnum
+
+import numpy as np
+
+# Result column telling why a run ended
+REASON_COLUMN = 'Powód zakończenia'
+
+
+class Termination(IntEnum):
+    RUNNING = 0
+    FINISHED = 1  # every robot reached a safe area
+    ALL_DEAD = 2  # every robot still outside the safe areas has a flat battery
+    STALLED = 3  # no remaining robot got closer to a target for stall_window seconds
+    TIMEOUT = 4  # max_time of simulated time passed
+
+
+LABELS = {
+    Termination.FINISHED: 'ukończono',
+    Termination.ALL_DEAD: 'rozładowane baterie',
+    Termination.STALLED: 'brak postępu',
+    Termination.TIMEOUT: 'limit czasu',
+}
+
+
+class Watchdog:
+    # Ends runs that would otherwise never finish, so unattended batches take bounded time. Works on (N,)
+    # robot arrays for one run or (K, N) ones for a batch of worlds, with one verdict per run
+    def __init__(self, config, shape, zones):
+        self.max_ticks = None if config.max_time is None else round(config.max_time / config.dt)
+        self.stall_ticks = None if config.stall_window is None else round(config.stall_window / config.dt)
+        self.zones = zones
+        # Closest each robot has been to a target centre, and the last tick any robot beat its record or finished
+        self.best = np.full(shape, np.inf)
+        self.last_progress = np.zeros(shape[:-1], dtype=np.int64)
+        self.remaining = np.full(shape[:-1], shape[-1])
+
+    def check(self, ticks, x, y, remaining, active):
+        # Termination code of every run after the given tick, RUNNING for the ones that may go on;
+        # remaining marks the robots that have not reached a safe area yet
+        alive = remaining & active
+        reason = np.full(remaining.shape[:-1], Termination.RUNNING, dtype=np.int8)
+        if self.max_ticks is not None and ticks >= self.max_ticks:
+            reason[...] = Termination.TIMEOUT
+        if self.stall_ticks is not None:
+            distance = self.zones.centre_distance(x, y)
+            closer = alive & (distance < self.best)
+            self.best = np.where(closer, distance, self.best)
+            count = remaining.sum(axis=-1)
+            self.last_progress = np.where(closer.any(axis=-1) | (count < self.remaining), ticks, self.last_progress)
+            self.remaining = count
+            reason = np.where(ticks - self.last_progress >= self.stall_ticks, Termination.STALLED, reason)
+        return np.where(remaining.any(axis=-1) & ~alive.any(axis=-1), Termination.ALL_DEAD, reason)
+
+    def keep(self, worlds):
+        # Drops the runs of a batch that are no longer stepped
+        self.best = self.best[worlds]
+        self.last_progress = self.last_progress[worlds]
+        self.remaining = self.remaining[worlds]
@@ -0,0 +1,167 @@
+import math
+from enum import IntEnum
+
+import numpy as np
+
+
+class Mode(IntEnum):
+    # What a robot is doing, held per robot in World.mode; the engine maps each mode to the colour it is drawn in
+    SEARCHING = 0
+    TARGET = 1  # sees the target (drawn green)
+    FOLLOWING = 2  # heads for another robot (blue)
+    STOPPED = 3  # in a safe area or out of battery (gray)
+
+
+class World:
+    # Kinematics of every robot held as arrays, so one step() updates the whole swarm at once
+    def __init__(self, width, height, speed, turn_speed, battery, rng=None):
+        self.width = width
+        self.height = height
+        self.default_speed = speed
+        self.turn_speed = turn_speed
+        self.default_battery = battery
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Bumped on every change to positions, headings or batteries so cached perception can be invalidated
+        self.version = 0
+
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.angle = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)
+        self.mode = np.zeros(0, dtype=np.uint8)
+        self.battery_level = np.zeros(0)
+        self.last_battery_update = np.zeros(0)
+
+    def __len__(self):
+        return len(self.x)
+
+    def add_robot(self, x, y, angle=None, now=0.0):
+        if angle is None:
+            angle = self.rng.uniform(0, 2 * math.pi)
+        index = len(self)
+        self.x = np.append(self.x, float(x))
+        self.y = np.append(self.y, float(y))
+        self.angle = np.append(self.angle, float(angle))
+        self.speed = np.append(self.speed, float(self.default_speed))
+        self.active = np.append(self.active, True)
+        self.mode = np.append(self.mode, np.uint8(Mode.SEARCHING))
+        self.battery_level = np.append(self.battery_level, float(self.default_battery))
+        self.last_battery_update = np.append(self.last_battery_update, now)
+        self.touch()
+        return index
+
+    def touch(self):
+        self.version += 1
+
+    def _indices(self, index):
+        if index is None:
+            return np.arange(len(self))
+        index = np.asarray(index)
+        if index.dtype == bool:
+            return np.flatnonzero(index)
+        return np.atleast_1d(index)
+
+    def rotate_towards(self, index, target_x, target_y):
+        idx = self._indices(index)
+        target_x = np.broadcast_to(np.asarray(target_x, dtype=float), idx.shape)
+        target_y = np.broadcast_to(np.asarray(target_y, dtype=float), idx.shape)
+        target_angle = np.arctan2(target_y - self.y[idx], target_x - self.x[idx])
+        angle_diff = (target_angle - self.angle[idx]) % (2 * math.pi)
+        angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+        self.angle[idx] = np.where(
+            np.abs(angle_diff) < self.turn_speed,
+            target_angle,
+            self.angle[idx] + np.clip(angle_diff, -self.turn_speed, self.turn_speed),
+        )
+        self.touch()
+
+    def rotate_randomly(self, index, noise=None):
+        # noise, when given, holds a pre-drawn turn for every robot and only the selected ones are applied
+        idx = self._indices(index)
+        if noise is None:
+            self.angle[idx] += self.rng.uniform(-self.turn_speed, self.turn_speed, size=len(idx))
+        else:
+            self.angle[idx] += np.asarray(noise)[idx]
+        self.touch()
+
+    def update_battery(self, clock, index=None, interval=10, drain=2):
+        # Returns the robots whose battery was drained and the ones that ran flat on this call
+        idx = self._indices(index)
+        idx = idx[self.active[idx]]
+        due = idx[clock.is_due(self.last_battery_update[idx], interval)]
+        self.battery_level[due] = np.maximum(0, self.battery_level[due] - drain)
+        self.last_battery_update[due] = clock.now
+
+        died = idx[self.battery_level[idx] <= 0]
+        self.speed[died] = 0
+        self.active[died] = False
+        if len(due) or len(died):
+            self.touch()
+        return due, died
+
+    def move(self, index=None):
+        idx = self._indices(index)
+        idx = idx[self.active[idx]]
+        x = self.x[idx] + self.speed[idx] * np.cos(self.angle[idx])
+        y = self.y[idx] + self.speed[idx] * np.sin(self.angle[idx])
+
+        outside = (x < 0) | (x > self.width) | (y < 0) | (y > self.height)
+        self.angle[idx[outside]] = (self.angle[idx[outside]] + math.pi) % (2 * math.pi)
+
+        self.x[idx] = np.clip(x, 0, self.width)
+        self.y[idx] = np.clip(y, 0, self.height)
+        self.touch()
+
+    def step(self, steer, target_x, target_y, wander, noise=None):
+        # steer/wander are boolean masks; target_x/target_y give a heading target per robot
+        steer = np.asarray(steer, dtype=bool)
+        target_x = np.broadcast_to(np.asarray(target_x, dtype=float), steer.shape)
+        target_y = np.broadcast_to(np.asarray(target_y, dtype=float), steer.shape)
+        self.rotate_towards(steer, target_x[steer], target_y[steer])
+        self.rotate_randomly(wander, noise)
+        self.move(self.active)
+
+    def collisions(self, robot_size, grid=None):
+        # Pairs (i < j) of active robots closer than robot_size, in the order a double loop would find them
+        if grid is not None:
+            first, second = grid.candidate_pairs(self.x, self.y)
+        else:
+            first, second = np.triu_indices(len(self), k=1)
+        distance = np.hypot(self.x[first] - self.x[second], self.y[first] - self.y[second])
+        keep = self.active[first] & self.active[second] & (distance < robot_size)
+        first, second = first[keep], second[keep]
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+
+    def stop(self, index):
+        self.speed[index] = 0
+        self.active[index] = False
+        self.touch()
+
+
+def _array_property(name):
+    def getter(self):
+        return getattr(self.world, name)[self.index].item()
+
+    def setter(self, value):
+        getattr(self.world, name)[self.index] = value
+        self.world.touch()
+
+    return property(getter, setter)
+
+
+class RobotView:
+    # Per-robot object API over one row of the World arrays
+    __slots__ = ('world', 'index')
+    x = _array_property('x')
+    y = _array_property('y')
+    angle = _array_property('angle')
+    speed = _array_property('speed')
+    active = _array_property('active')
+    battery_level = _array_property('battery_level')
+    last_battery_update = _array_property('last_battery_update')
+
+    def __init__(self, world, index):
+        self.world = world
+        self.index = index
@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+from spatial_hash import RectIndex
+
+
+def spawn_position(rng, regions):
+    # A start position drawn uniformly from one of the spawn regions (x, y, w, h, weight), picked by weight.
+    # With a single region nothing is drawn for the pick, so the default arena keeps its random stream
+    if len(regions) > 1:
+        weights = np.array([region[4] for region in regions], dtype=float)
+        x, y, w, h, _ = regions[rng.choice(len(regions), p=weights / weights.sum())]
+    else:
+        x, y, w, h, _ = regions[0]
+    return rng.uniform(x, x + w), rng.uniform(y, y + h)
+
+
+def _nearest(robots, zones, values, n):
+    # Smallest value per robot and the zone it belongs to (ties to the lowest zone), from an (n, m) array
+    # over every pair or from flat (robot, zone) pairs; inf and -1 for robots without any
+    if values.ndim == 2:
+        if values.shape[1] == 0:
+            return np.full(n, np.inf), np.full(n, -1)
+        best = values.argmin(axis=1)
+        return values[np.arange(n), best], best
+    order = np.lexsort((zones, values, robots))
+    robots, zones, values = robots[order], zones[order], values[order]
+    first = np.ones(len(robots), dtype=bool)
+    first[1:] = robots[1:] != robots[:-1]
+    smallest, best = np.full(n, np.inf), np.full(n, -1)
+    smallest[robots[first]], best[robots[first]] = values[first], zones[first]
+    return smallest, best
+
+
+class Zones:
+    # The targets and safe zones of an arena. Past a handful of zones each kind is kept in a RectIndex, so
+    # the per-tick checks only test the zones near each robot however many there are. Queries take robot
+    # arrays of any shape, e.g. (N,) for one run or (K, N) for a batch of worlds, and answer in that shape
+    DENSE_LIMIT = 16
+
+    def __init__(self, config):
+        self.view_distance = config.view_distance
+        self.view_angle = config.view_angle
+        self.targets = np.array(config.target_rects(), dtype=float).reshape(-1, 4)
+        self.centres = self.targets[:, :2] + self.targets[:, 2:] / 2
+        # Safe zones as the integer pygame.Rect values, and the robot's rect offset and size as pygame truncates them
+        self.safe = np.array([tuple(area) for area in config.safe_areas()], dtype=np.int64).reshape(-1, 4)
+        self.rect_offset = config.robot_size // 2
+        self.rect_size = int(config.robot_size)
+        self.target_index = RectIndex(self.targets, config.view_distance)
+        self.safe_index = RectIndex(self.safe, max(4 * config.robot_size, 1))
+
+    def _pairs(self, index, x, y, reach):
+        # Robot and zone indices of the pairs worth testing: an (n, 1) and an (m,) range that broadcast to
+        # every pair while there are few zones, otherwise the flat pairs the index finds within reach
+        if len(index) <= self.DENSE_LIMIT:
+            return np.arange(len(x))[:, None], np.arange(len(index))
+        return index.query(x, y, reach)
+
+    def in_safe_area(self, x, y):
+        # pygame.Rect(x - size // 2, y - size // 2, size, size).colliderect(zone) for any safe zone
+        shape, x, y = np.shape(x), np.ravel(x), np.ravel(y)
+        if self.rect_size <= 0:
+            return np.zeros(shape, dtype=bool)
+        robots, zones = self._pairs(self.safe_index, x, y, 2 * self.rect_size)
+        left = np.trunc(x[robots] - self.rect_offset).astype(np.int64)
+        top = np.trunc(y[robots] - self.rect_offset).astype(np.int64)
+        zx, zy, zw, zh = self.safe[zones].T
+        hit = (left < zx + zw) & (top < zy + zh) & (left + self.rect_size > zx) & (top + self.rect_size > zy) & \
+            (zw > 0) & (zh > 0)
+        if hit.ndim == 2:
+            return hit.any(axis=1).reshape(shape)
+        safe = np.zeros(len(x), dtype=bool)
+        safe[robots[hit]] = True
+        return safe.reshape(shape)
+
+    def visible_target(self, x, y, angle):
+        # Index of the nearest target whose centre is in each robot's view cone, -1 when none is;
+        # ties go to the lowest index
+        shape, x, y, angle = np.shape(x), np.ravel(x), np.ravel(y), np.ravel(angle)
+        robots, targets = self._pairs(self.target_index, x, y, self.view_distance)
+        centre_x, centre_y = self.centres[targets].T
+        distance = np.hypot(x[robots] - centre_x, y[robots] - centre_y)
+        angle_diff = (np.arctan2(centre_y - y[robots], centre_x - x[robots]) - angle[robots]) % (2 * math.pi)
+        angle_diff = np.where(angle_diff > math.pi, angle_diff - 2 * math.pi, angle_diff)
+        seen = (distance <= self.view_distance) & (-self.view_angle / 2 <= angle_diff) & \
+            (angle_diff <= self.view_angle / 2)
+        distance, nearest = _nearest(robots, targets, np.where(seen, distance, np.inf), len(x))
+        return np.where(np.isfinite(distance), nearest, -1).reshape(shape)
+
+    def target_distance(self, x, y):
+        # Distance to the nearest target, measured to its rect shrunk by 5 px on every side; targets beyond
+        # the view distance may be left out, so only distances below it are exact
+        shape, x, y = np.shape(x), np.ravel(x), np.ravel(y)
+        robots, targets = self._pairs(self.target_index, x, y, self.view_distance)
+        tx, ty, tw, th = self.targets[targets].T
+        nearest_x = np.maximum(tx + 5, np.minimum(x[robots], tx + tw - 5))
+        nearest_y = np.maximum(ty + 5, np.minimum(y[robots], ty + th - 5))
+        distance = np.sqrt((x[robots] - nearest_x) ** 2 + (y[robots] - nearest_y) ** 2)
+        return _nearest(robots, targets, distance, len(x))[0].reshape(shape)
+
+    def centre_distance(self, x, y):
+        # Distance to the nearest target centre at any range, e.g. to tell whether a robot is making progress
+        x, y = np.asarray(x)[..., None], np.asarray(y)[..., None]
+        centre_x, centre_y = self.centres.T
+        return np.hypot(x - centre_x, y - centre_y).min(axis=-1, initial=np.inf)